@@ -0,0 +1,101 @@
+"""
+Throughput benchmark for the conversion of TeX markup to Markdown: We compare the single-scan
+converter in `sections.util` with the multi-pass implementation it replaced, on all lines of
+the appendix.
+
+    $ python benchmarks/convert.py
+"""
+import re
+import sys
+import time
+import pathlib
+import collections
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent))
+from sections import util  # noqa: E402
+
+APPENDIX = pathlib.Path(__file__).parent.parent / 'raw' / 'data.tex'
+
+
+def legacy_parse_refs(s, strip=False):
+    refs = collections.OrderedDict()
+
+    def repl(m):
+        d = m.groupdict()
+        pages = d.get('pagesa') or d.get('pagesb') or d.get('pages')
+        for ref in m.group('ref').split(','):
+            ref = ref.strip()
+            refs[(util.fix_bibkey(ref), (pages.strip() or None) if pages else None)] = None
+        if strip:
+            return ''
+        res = m.group('ref')
+        if pages and pages.strip():
+            res += ': {0}'.format(pages.strip())
+        return res
+
+    s = re.sub(
+        '\\\\cite(p|t|year)(\\[(?P<pages>[^\\]]+)\\])?{(?P<ref>[^}]+)}',
+        repl,
+        s)
+    s = re.sub(
+        '\\\\citealt(\\[(?P<pagesa>[^\\]]+)\\])?{(?P<ref>[^}]+)}(:\\s*(?P<pagesb>[0-9\\-,\\s]+))?',
+        repl,
+        s)
+    return s, list(refs)
+
+
+def legacy_convert_text(s, strip=False):
+    s, refs = legacy_parse_refs(s, strip=strip)
+    s = util.tex_pattern('ili').sub(lambda m: m.group('text'), s)
+    s = util.tex_pattern('textit').sub(lambda m: '*' + m.group('text') + '*', s)
+    for k, v in {
+        '\\%': '%',
+        '{\\textasciitilde}': '~',
+        '\\&': '&',
+        '\\textsubscript{2}': '₂',
+        '\\~{l}': 'l̃',
+        '\\u{}': '̆ ',
+    }.items():
+        s = s.replace(k, v)
+
+    s = util.tex_pattern('textsubscript').sub(lambda m: '<sub>' + m.group('text') + '</sub>', s)
+    s = util.tex_pattern('textsuperscript').sub(lambda m: '<sup>' + m.group('text') + '</sup>', s)
+    return s, refs
+
+
+def single_scan(s, strip=False):
+    s, refs = util._scan(util.TEXT_PATTERN, s, strip)
+    return s, list(refs)
+
+
+def memoized(s, strip=False):
+    s, refs = util._convert_text(s, strip)
+    return s, list(refs)
+
+
+def main(repeat=5):
+    corpus = [
+        line.strip() for line in APPENDIX.read_text(encoding='utf8').split('\n') if line.strip()]
+    nchars = sum(len(s) for s in corpus)
+    for s in corpus:
+        assert legacy_convert_text(s) == single_scan(s), s
+
+    print('{0} strings, {1} characters'.format(len(corpus), nchars))
+    print('{0:<12} {1:>10} {2:>12}'.format('converter', 'secs', 'Mchars/sec'))
+    for name, func in [
+        ('legacy', legacy_convert_text),
+        ('single-scan', single_scan),
+        ('memoized', memoized),
+    ]:
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for s in corpus:
+                func(s)
+            times.append(time.perf_counter() - start)
+        secs = min(times)
+        print('{0:<12} {1:>10.4f} {2:>12.2f}'.format(name, secs, nchars / secs / 1e6))
+
+
+if __name__ == '__main__':
+    main()
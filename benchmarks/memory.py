@@ -0,0 +1,109 @@
+"""
+Memory footprint of the parse tree and of the records of the language sections, measured with
+`tracemalloc` on synthetic appendices made of 1-100 copies of the real one - and peak RSS of
+streaming `makecldf` builds of synthetic appendices with 1000 and 10000 language sections, which
+should stay flat.
+
+    $ python benchmarks/memory.py
+"""
+import sys
+import shutil
+import logging
+import pathlib
+import argparse
+import subprocess
+import tempfile
+import contextlib
+import tracemalloc
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent))
+from sections.util import parse  # noqa: E402
+from sections import PARAM_CLASSES  # noqa: E402
+from sections.stats import peak_memory  # noqa: E402
+from benchmarks.synthetic import synthetic_appendix  # noqa: E402
+from benchmarks.suite import dataset_dir  # noqa: E402
+import cldfbench_easterdaysyllablestructure as dataset  # noqa: E402
+from cldfbench_easterdaysyllablestructure import section_data  # noqa: E402
+
+
+def allocated(func, *args):
+    """
+    :return: `tuple` (result, MB) of the result of calling `func` and the memory it allocated - \
+    and which is still referenced by the result.
+    """
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        res = func(*args)
+        return res, (tracemalloc.get_traced_memory()[0] - before) / 2 ** 20
+    finally:
+        tracemalloc.stop()
+
+
+def records(secs):
+    res = []
+    for sec in secs:
+        data = section_data(sec)[0]
+        res.append([cls(**data[name]) for name, cls in PARAM_CLASSES.items()])
+    return res
+
+
+def write_dataset(size, d):
+    """
+    Write a dataset with a synthetic appendix of `size` language sections to directory `d`.
+    """
+    with dataset_dir(synthetic_appendix(size)) as tmp:
+        shutil.copytree(str(tmp), str(d))
+
+
+def build(d):
+    """
+    Run a full streaming build of the dataset in directory `d`, printing the peak RSS in MB.
+    """
+    ds = type('Dataset', (dataset.Dataset,), {'dir': pathlib.Path(d)})()
+    args = argparse.Namespace(
+        log=logging.getLogger(__name__), glottolog=None, full=True, stream=True)
+    with contextlib.redirect_stdout(None):
+        ds._cmd_makecldf(args)
+    print(peak_memory())
+
+
+def peak_rss(size):
+    """
+    :return: `tuple` (appendix MB, peak RSS MB) of a streaming build of a synthetic appendix with \
+    `size` language sections.
+    """
+    # Peak RSS is a per-process measure - and inherited by child processes on Linux. So we write
+    # the dataset and build it in separate subprocesses - spawned before this process grew large:
+    with tempfile.TemporaryDirectory() as tmp:
+        d = pathlib.Path(tmp) / 'dataset'
+        subprocess.check_call([sys.executable, __file__, '--dataset', str(size), str(d)])
+        out = subprocess.check_output([sys.executable, __file__, '--build', str(d)])
+        source = d.joinpath('raw', 'data.tex').stat().st_size / 2 ** 20
+    return source, float(out.decode().split()[-1])
+
+
+def main():
+    print('{0:>10} {1:>10} {2:>16}'.format('sections', 'source MB', 'stream peak MB'))
+    for size in [1000, 10000]:
+        source, peak = peak_rss(size)
+        print('{0:>10} {1:>10.1f} {2:>16.1f}'.format(size, source, peak))
+
+    print()
+    print('{0:>6} {1:>10} {2:>10} {3:>10} {4:>10}'.format(
+        'factor', 'sections', 'source MB', 'tree MB', 'records MB'))
+    for factor in [1, 10, 100]:
+        text = synthetic_appendix(100 * factor).encode('utf8')
+        secs, tree = allocated(parse, text)
+        _, recs = allocated(records, secs)
+        print('{0:>6} {1:>10} {2:>10.1f} {3:>10.1f} {4:>10.1f}'.format(
+            factor, len(secs), len(text) / 2 ** 20, tree, recs))
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['--dataset']:
+        write_dataset(int(sys.argv[2]), sys.argv[3])
+    elif sys.argv[1:2] == ['--build']:
+        build(sys.argv[2])
+    else:
+        main()
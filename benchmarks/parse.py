@@ -0,0 +1,35 @@
+"""
+Micro-benchmark for parsing the appendix: Parse time should scale linearly with the number of
+language sections, which we check on synthetic appendices made of 10-100 copies of the real one.
+
+    $ python benchmarks/parse.py
+"""
+import sys
+import time
+import pathlib
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent))
+from sections.util import parse  # noqa: E402
+from benchmarks.synthetic import synthetic_appendix  # noqa: E402
+
+
+def timed(func, *args, **kw):
+    repeat = kw.pop('repeat', 3)
+    res = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        res.append(time.perf_counter() - start)
+    return min(res)
+
+
+def main():
+    print('{0:>6} {1:>10} {2:>10} {3:>14}'.format('factor', 'sections', 'secs', 'usecs/section'))
+    for factor in [1, 10, 30, 100]:
+        n = 100 * factor
+        secs = timed(parse, synthetic_appendix(n), repeat=3 if factor < 100 else 1)
+        print('{0:>6} {1:>10} {2:>10.3f} {3:>14.1f}'.format(factor, n, secs, secs / n * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,37 @@
+"""
+Throughput benchmark for the phoneme segmenter: We segment synthetic transcriptions, i.e. words
+made of random consonant and vowel segments from `etc/phonemes.csv`, written without spaces
+between segments.
+
+    $ python benchmarks/segments.py
+"""
+import sys
+import time
+import random
+import pathlib
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent))
+from sections.segments import SEGMENTERS, Segmenter, DELIMITER  # noqa: E402
+
+
+def main():
+    segments = [
+        s.strip(DELIMITER) for pid in ['Consonant_inventory', 'Vowel_inventory']
+        for s in SEGMENTERS[pid].segments if s.strip(DELIMITER)]
+    random.seed(42)
+    print('{0:>10} {1:>10} {2:>10} {3:>10}'.format('words', 'chars', 'cold secs', 'warm secs'))
+    for n in [1000, 10000, 100000]:
+        text = ' '.join(
+            ''.join(random.choice(segments) for _ in range(random.randint(2, 8)))
+            for _ in range(n))
+        segmenter = Segmenter('*', segments)
+        res = []
+        for _ in range(2):
+            start = time.perf_counter()
+            segmenter(text)
+            res.append(time.perf_counter() - start)
+        print('{0:>10} {1:>10} {2:>10.3f} {3:>10.3f}'.format(n, len(text), *res))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+"""
+Benchmark suite, timing the stages of the CLDF conversion separately - on the real appendix and
+on synthetic appendices with a given number of language sections (see `synthetic.py`).
+
+    $ python benchmarks/suite.py --sizes 0,1000,10000,100000 --save-baseline
+    $ python benchmarks/suite.py --sizes 0,1000,10000,100000 --threshold 0.2
+
+Size 0 stands for the real appendix. Results are stored as JSON, mapping "<stage>@<size>" to
+seconds; when a baseline exists, stages which got slower by more than `--threshold` (a fraction)
+are flagged as regressions and the script exits with status 1.
+"""
+import sys
+import json
+import time
+import shutil
+import logging
+import pathlib
+import argparse
+import tempfile
+import contextlib
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent))
+import cldfbench_easterdaysyllablestructure as dataset  # noqa: E402
+from sections import util, PARAM_CLASSES  # noqa: E402
+from sections.glottolog import Languoid, LanguoidIndex  # noqa: E402
+from benchmarks.synthetic import synthetic_appendix, APPENDIX  # noqa: E402
+
+REPO = pathlib.Path(__file__).parent.parent
+BASELINE = pathlib.Path(__file__).parent / 'baseline.json'
+STAGES = [
+    'iter_sections', 'section_data', 'converters', 'convert_text', 'glottolog', 'makecldf']
+
+
+def timed(func, repeat=1):
+    res = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        res.append(time.perf_counter() - start)
+    return min(res)
+
+
+@contextlib.contextmanager
+def dataset_dir(text):
+    """
+    A temporary copy of the dataset directory, with `text` as appendix and a Glottolog snapshot
+    for offline builds.
+    """
+    tmp = pathlib.Path(tempfile.mkdtemp())
+    try:
+        for d in ['raw', 'etc']:
+            (tmp / d).mkdir()
+        (tmp / 'raw' / 'data.tex').write_text(text, encoding='utf8')
+        shutil.copy(str(REPO / 'raw' / 'sources.bib'), str(tmp / 'raw'))
+        for name in ['languages.csv', 'phonemes.csv']:
+            shutil.copy(str(REPO / 'etc' / name), str(tmp / 'etc'))
+        shutil.copy(str(REPO / 'metadata.json'), str(tmp))
+        index = LanguoidIndex(tmp / 'etc' / dataset.GLOTTOLOG_SNAPSHOT)
+        index.version, index._languoids = 'synthetic', {
+            sec.iso: Languoid('{0}1234'.format(sec.iso), 0.0, 0.0, ['Eurasia'])
+            for sec in util.iter_parse(text)}
+        index.write()
+        yield tmp
+    finally:
+        shutil.rmtree(str(tmp))
+
+
+def run(size, stages, repeat):
+    text = APPENDIX.read_text(encoding='utf8') if size == 0 else synthetic_appendix(size)
+    repeat = repeat if size <= 1000 else 1
+    secs = util.parse(text)
+    data = [dataset.section_data(sec)[0] for sec in secs]
+    res = {}
+
+    if 'iter_sections' in stages:
+        res['iter_sections'] = timed(lambda: util.parse(text), repeat)
+
+    if 'section_data' in stages:
+        res['section_data'] = timed(lambda: [dataset.section_data(sec) for sec in secs], repeat)
+
+    if 'converters' in stages:
+        for name, cls in PARAM_CLASSES.items():
+            res['converters:{0}'.format(name)] = timed(
+                lambda: [cls(**d[name]) for d in data], repeat)
+
+    if 'convert_text' in stages:
+        values = [item.value for sec in secs for ss in sec.subsections for item in ss.items]
+
+        def convert():
+            util._convert_text.cache_clear()
+            for v in values:
+                util._convert_text(v, False)
+
+        res['convert_text'] = timed(convert, repeat)
+
+    if 'glottolog' in stages or 'makecldf' in stages:
+        with dataset_dir(text) as d:
+            if 'glottolog' in stages:
+                def lookup():
+                    index = LanguoidIndex(d / 'etc' / dataset.GLOTTOLOG_SNAPSHOT)
+                    for sec in secs:
+                        assert index[sec.iso]
+
+                res['glottolog'] = timed(lookup, repeat)
+
+            if 'makecldf' in stages:
+                ds = type('Dataset', (dataset.Dataset,), {'dir': d})()
+                args = argparse.Namespace(
+                    log=logging.getLogger(__name__), glottolog=None, full=True)
+                with contextlib.redirect_stdout(None):
+                    res['makecldf'] = timed(lambda: ds._cmd_makecldf(args), 1)
+    return res
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument(
+        '--sizes', default='0,1000', help='Comma-separated numbers of language sections')
+    parser.add_argument('--stages', default=','.join(STAGES))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--baseline', type=pathlib.Path, default=BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', default=False)
+    parser.add_argument(
+        '--threshold', type=float, default=0.2, help='Relative slowdown to flag as regression')
+    args = parser.parse_args(args)
+
+    results = {}
+    for size in [int(s) for s in args.sizes.split(',')]:
+        for stage, secs in run(size, args.stages.split(','), args.repeat).items():
+            results['{0}@{1}'.format(stage, size or 'real')] = secs
+
+    baseline = {}
+    if args.baseline.exists() and not args.save_baseline:
+        baseline = json.loads(args.baseline.read_text(encoding='utf8'))
+
+    regressions = []
+    print('{0:<40} {1:>10} {2:>10} {3:>8}'.format('stage', 'secs', 'baseline', 'change'))
+    for key, secs in results.items():
+        base, change, flag = baseline.get(key), '', ''
+        if base:
+            change = secs / base - 1
+            if change > args.threshold:
+                regressions.append(key)
+                flag = ' REGRESSION'
+            change = '{0:+.0%}'.format(change)
+        print('{0:<40} {1:>10.4f} {2:>10} {3:>8}{4}'.format(
+            key, secs, '{0:.4f}'.format(base) if base else '', change, flag))
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(results, indent=4), encoding='utf8')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,49 @@
+"""
+Throughput benchmark for the syllabifier: We syllabify synthetic word lists, i.e. words made of
+random licit syllables of random languages, filled with segments from the languages' inventories -
+serially and in pools of worker processes.
+
+    $ python benchmarks/syllabify.py
+"""
+import sys
+import random
+import pathlib
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent))
+from sections.syllabify import load_syllabifiers, syllabify, Throughput  # noqa: E402
+from sections.util import normalize_phoneme  # noqa: E402
+from sections.check import _tables, _rows  # noqa: E402
+
+CLDF = pathlib.Path(__file__).parent.parent / 'cldf'
+
+
+def words(syllabifiers, n):
+    inventories = {}
+    for row in _rows(_tables(CLDF)[0]['ValueTable']):
+        if row['Parameter_ID'] in ['Consonant_inventory', 'Vowel_inventory']:
+            inventories.setdefault((row['Language_ID'], row['Parameter_ID'][0]), []).append(
+                normalize_phoneme(row['Value']))
+    lids = sorted(syllabifiers)
+    for _ in range(n):
+        lid = random.choice(lids)
+        shapes = sorted(syllabifiers[lid].shapes)
+        yield lid, ''.join(
+            random.choice(inventories[lid, cls])
+            for _ in range(random.randint(1, 4)) for cls in random.choice(shapes))
+
+
+def main():
+    syllabifiers = load_syllabifiers(CLDF)
+    random.seed(42)
+    wordlist = list(words(syllabifiers, 200000))
+    print('{0:>10} {1:>10} {2:>10} {3:>10}'.format('words', 'workers', 'secs', 'words/s'))
+    for workers in [1, 2, 4]:
+        throughput = Throughput()
+        for _ in syllabify(wordlist, syllabifiers, workers=workers, throughput=throughput):
+            pass
+        print('{0:>10} {1:>10} {2:>10.2f} {3:>10.0f}'.format(
+            throughput.words, workers, throughput.seconds, throughput.words_per_second))
+
+
+if __name__ == '__main__':
+    main()
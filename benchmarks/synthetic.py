@@ -0,0 +1,53 @@
+"""
+Generate synthetic appendices of arbitrary size from the language sections of the real one.
+
+Section `i` of a synthetic appendix is a copy of section `i % 100` of the real appendix, marked
+with a line "Synthetic copy <i>" - which doesn't end up in any value, but makes each section's
+content, and thus its fingerprint, unique.
+
+    $ python benchmarks/synthetic.py 10000 > data_10k.tex
+"""
+import sys
+import pathlib
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent))
+from sections.util import IGNORED_MARKUP  # noqa: E402
+
+APPENDIX = pathlib.Path(__file__).parent.parent / 'raw' / 'data.tex'
+
+
+def split_appendix(text):
+    """
+    :return: `tuple` (preamble, sections, trailer) with `sections` being the list of TeX sources \
+    of the language sections.
+    """
+    preamble, sections = [], []
+    for line in text.rstrip().split('\n'):
+        if IGNORED_MARKUP.sub('', line).strip().startswith('\\section*'):
+            sections.append([])
+        (sections[-1] if sections else preamble).append(line)
+    # The appendix ends with the closing brace of "{\sloppy":
+    assert sections[-1][-1] == '}'
+    sections[-1].pop()
+    return \
+        '\n'.join(preamble) + '\n', \
+        ['\n'.join(lines).rstrip() + '\n' for lines in sections], \
+        '}\n'
+
+
+def synthetic_appendix(n, text=None):
+    """
+    :param n: Number of language sections.
+    :param text: TeX source of the appendix to use as template.
+    """
+    preamble, sections, trailer = split_appendix(text or APPENDIX.read_text(encoding='utf8'))
+    chunks = [preamble]
+    for i in range(n):
+        headline, _, rest = sections[i % len(sections)].partition('\n')
+        chunks.append('{0}\nSynthetic copy {1}\n{2}'.format(headline, i, rest))
+    chunks.append(trailer)
+    return ''.join(chunks)
+
+
+if __name__ == '__main__':
+    sys.stdout.write(synthetic_appendix(int(sys.argv[1])))
@@ -1,17 +1,189 @@
 import re
 import pathlib
+import cProfile
+import datetime
 import collections
+import concurrent.futures
 
-from cldfbench import Dataset as BaseDataset, CLDFSpec
-from clldutils.misc import slug
+from cldfbench import Dataset as BaseDataset, CLDFSpec, CLDFWriter
+from clldutils.clilib import ParserError
 
+import sections
 from sections.util import *
-from sections import PARAM_CLASSES
+from sections import PARAM_CLASSES, SCHEMA
+from sections.schema import code_id, ValueIDs
+from sections.glottolog import LanguoidIndex
+from sections.cache import BuildCache, code_version, read_bib
+from sections.stats import Stats, NOSTATS, peak_memory
+from sections.matrix import MatrixBuilder
+from sections.db import DatabaseBuilder
+from sections.phonemes import PhonemeIndex, PHONEME_PARAMS
+from sections.cube import Cube
+from sections.download import download
+from sections.check import check, check_templates
+from sections.search import SearchIndex
+from sections.templates import TemplateIndex
+from sections.segments import SEGMENTERS
 
+BASE_URL = 'https://raw.githubusercontent.com/langsci/249/master/'
+GLOTTOLOG_SNAPSHOT = 'glottolog.json'
+MATRIX_DIR = 'matrix'
+DATABASE = 'easterday.sqlite'
+CUBE = 'cube.json'
+SEARCH_INDEX = 'search-index.json'
+TEMPLATE_INDEX = 'template-index.json'
+DAEMON_SOCKET = 'daemon.sock'
+PROCESS_PARAMS = {
+    'Vowel reduction processes': 'R',
+    'Consonant allophony processes': 'C',
+}
+PROCESS_VALUE_PATTERN = re.compile('(?P<iso>[a-z]{3})-(?P<pid>[RC])(?P<no>[0-9]+)$')
 
-def code_id(param, code):
-    f = base16 if param.endswith('_inventory') else slug
-    return '{0}-{1}'.format(param, f(code))
+
+def iter_section_values(secs, cache, workers=1, stats=NOSTATS):
+    """
+    Generate pairs (sec, (values, refs)) for `secs`, extracting the values of sections which are
+    not yet in `cache` - in a pool of `workers` processes if `workers > 1`.
+
+    Results are generated in the order of `secs`, and only a small window of sections is
+    processed ahead, to keep memory use bounded.
+    """
+    workers = int(workers or 1)
+    # Worker processes must segment inventories with the same known segments as this process:
+    executor = concurrent.futures.ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=SEGMENTERS.use,
+        initargs=(SEGMENTERS.path,)) if workers > 1 else None
+    pending = collections.deque()
+
+    def resolve(sec, future):
+        if future:
+            cache[sec.fingerprint] = future.result()
+        return sec, cache[sec.fingerprint]
+
+    try:
+        for sec in secs:
+            future = None
+            if sec.fingerprint not in cache:
+                if executor:
+                    future = executor.submit(section_values, sec)
+                else:
+                    with stats.stage('extraction'):
+                        cache[sec.fingerprint] = section_values(sec, stats=stats)
+            pending.append((sec, future))
+            while len(pending) > workers * 4:
+                yield resolve(*pending.popleft())
+        while pending:
+            yield resolve(*pending.popleft())
+    finally:
+        if executor:
+            executor.shutdown()
+
+
+def section_data(sec):
+    """
+    Sort the items of a language section into raw data for the classes in `PARAM_CLASSES` and
+    process descriptions.
+
+    :return: `tuple` (data, processes) of a `dict` mapping section names to `dict` s of raw item \
+    values and a `list` of pairs (Parameter_ID, Item) for process descriptions.
+    """
+    data, processes = {k: {} for k in PARAM_CLASSES}, []
+    for ss in sec.subsections:
+        for item in ss.items:
+            if sec.iso == 'yue' and item.name == 'N consonant phonemes':
+                # https://github.com/langsci/249/issues/1
+                item.name = 'C phoneme inventory'
+
+            if item.attribute == 'Phonetic_correlates_of_stress' and ss.name != 'Suprasegmentals':
+                # https://github.com/langsci/249/issues/3
+                assert sec.name == 'Towa'
+                data['Suprasegmentals'][item.attribute] = item.value
+            elif ss.name in data:
+                data[ss.name][item.attribute] = item.value
+            else:
+                assert PROCESS_VALUE_PATTERN.match(item.name) or item.name == 'Notes'
+                processes.append((PROCESS_PARAMS[ss.name], item))
+    return data, processes
+
+
+def section_values(sec, stats=NOSTATS):
+    """
+    Extract the values from the data of one language section.
+
+    :return: `tuple` (values, refs) of the list of `ValueTable` rows - without ID - and the \
+    list of keys of the sources referenced in these rows.
+    """
+    values, srcs = [], collections.OrderedDict()
+    data, processes = section_data(sec)
+    for pid, item in processes:
+        text, refs = stats.call('convert_text', pid, convert_text, item.value, warn_only=True)
+        values.append({
+            'Language_ID': sec.iso,
+            'Parameter_ID': pid,
+            'Value': text,
+            'Comment': item.name,
+            'Source': format_refs(refs),
+        })
+
+    for k, d in data.items():
+        stats.converters(PARAM_CLASSES[k], d)
+    data = {k: stats.call('class', k, PARAM_CLASSES[k], **d) for k, d in data.items()}
+
+    for n, params in SCHEMA.items():
+        for param in params:
+            v = stats.call('getter', param.id, param.getter, data[n])
+            refs = param.refsgetter(data[n]) if param.refsgetter else []
+            if v:
+                srcs.update([(r[0], None) for r in refs])
+                if param.multichoice:
+                    for vv in v:
+                        values.append({
+                            'Language_ID': sec.iso,
+                            'Parameter_ID': param.id,
+                            'Value': vv,
+                            'Source': format_refs(refs),
+                            'Code_ID': code_id(param.id, vv)
+                        })
+                else:
+                    kw = {
+                        'Language_ID': sec.iso,
+                        'Parameter_ID': param.id,
+                        'Value': v,
+                        'Source': format_refs(refs),
+                    }
+                    if param.codes:
+                        kw['Code_ID'] = code_id(param.id, v)
+                    values.append(kw)
+    return values, list(srcs)
+
+
+class Writer(CLDFWriter):
+    """
+    A CLDF writer, timing the writing of the data and writing the report of an instrumented build.
+    It also runs the integrity check of the written data - if requested.
+    """
+    stats = NOSTATS
+    report = None
+    # Set to `True` to check all values or to a set of Language_IDs to check only their values:
+    check = None
+
+    def write(self, **kw):
+        with self.stats.stage('writer'):
+            super().write(**kw)
+        if self.check:
+            languages = None if self.check is True else self.check
+            with self.stats.stage('check'):
+                errors = check(self.cldf_spec.dir, languages=languages)
+                warnings = check_templates(self.cldf_spec.dir, languages=languages)
+            for warning in warnings:
+                self.args.log.warning(warning)
+            for error in errors:
+                self.args.log.error(error)
+            if errors:
+                raise ValueError('{0} integrity errors'.format(len(errors)))
+        if self.report:
+            self.stats.write(self.report)
 
 
 class Dataset(BaseDataset):
@@ -19,7 +191,39 @@ class Dataset(BaseDataset):
     id = "easterdaysyllablestructure"
 
     def cldf_specs(self):  # A dataset must declare all CLDF sets it creates.
-        return CLDFSpec(module='StructureDataset', dir=self.cldf_dir)
+        return CLDFSpec(module='StructureDataset', dir=self.cldf_dir, writer_cls=Writer)
+
+    @property
+    def cache_dir(self):
+        return self.dir / '.cache'
+
+    def glottolog_index(self, args):
+        #
+        # Without a Glottolog clone - or when asked explicitly - we build offline, i.e. from the
+        # snapshot in etc/.
+        #
+        if getattr(args, 'offline', False) or not getattr(args, 'glottolog', None):
+            snapshot = self.etc_dir / GLOTTOLOG_SNAPSHOT
+            if not snapshot.exists():
+                # Reported by the cldfbench CLI as error message - rather than with traceback:
+                raise ParserError(
+                    'No Glottolog snapshot at {0} - create it by running makecldf with '
+                    '--glottolog PATH --glottolog-snapshot'.format(snapshot))
+            return LanguoidIndex.load(snapshot)
+        index = LanguoidIndex.from_catalog(args.glottolog, self.cache_dir)
+        if getattr(args, 'glottolog_snapshot', False):
+            index.write(self.etc_dir / GLOTTOLOG_SNAPSHOT)
+        return index
+
+    def warm(self, args):
+        """
+        Load what each build needs - Glottolog index, bibliography and parse tree of the appendix -
+        into memory, where it is re-used by subsequent builds in the same process, as long as the
+        underlying files don't change.
+        """
+        len(self.glottolog_index(args))
+        read_bib(self.raw_dir, 'sources.bib', self.cache_dir / 'bib')
+        parse_sections(self.raw_dir / 'data.tex')
 
     def cmd_readme(self, args):
         lines, title_found = [], False
@@ -34,22 +238,28 @@ class Dataset(BaseDataset):
                 ])
         return '\n'.join(lines)
 
+    def _cmd_download(self, args):
+        # We only record the time of the download in raw/README.md if anything changed.
+        self.raw_dir.mkdir(exist_ok=True)
+        if self.cmd_download(args):
+            self.raw_dir.joinpath('README.md').write_text(
+                'Raw data downloaded {0}'.format(datetime.datetime.utcnow().isoformat()),
+                encoding='utf8')
+
     def cmd_download(self, args):
         #
-        # We download the TeX source of appendix and bibliography of the LSP book.
+        # We download the TeX source of appendix and bibliography of the LSP book - unless they
+        # didn't change since the last download, according to raw/manifest.json.
         #
-        BASE_URL = 'https://raw.githubusercontent.com/langsci/249/master/'
-        self.raw_dir.download(BASE_URL + 'chapters/appendixB.tex', 'data.tex')
-        self.raw_dir.download(BASE_URL + 'localbibliography.bib', 'sources.bib')
-        lines = []
-        at_line_pattern = re.compile('@(?P<type>[a-z]+){(?P<key>[^,]+),')
-        # Make sure BibTeX keys are ASCII-only:
-        for line in self.raw_dir.read('sources.bib').split('\n'):
-            m = at_line_pattern.match(line)
-            if m:
-                line = '@{0}{{{1},'.format(m.group('type'), fix_bibkey(m.group('key')))
-            lines.append(line)
-        self.raw_dir.write('sources.bib', '\n'.join(lines))
+        return download(
+            self.raw_dir,
+            [
+                ('chapters/appendixB.tex', 'data.tex', None),
+                ('localbibliography.bib', 'sources.bib', fix_bibkeys),
+            ],
+            getattr(args, 'base_url', None) or BASE_URL,
+            force=getattr(args, 'force', False),
+            log=getattr(args, 'log', None))
 
     def cmd_makecldf(self, args):
         #
@@ -76,37 +286,31 @@ class Dataset(BaseDataset):
                 'dc:description': 'Whether a parameter may have multiple values per language',
             })
         args.writer.cldf.add_component('CodeTable')
-        sources = collections.OrderedDict([(e.id, e) for e in self.raw_dir.read_bib()])
+        stats = NOSTATS
+        if getattr(args, 'report', False):
+            stats = args.writer.stats = Stats()
+            args.writer.report = self.dir / 'build-report.json'
+        with stats.stage('bibliography'):
+            sources = read_bib(self.raw_dir, 'sources.bib', self.cache_dir / 'bib')
         lname2gc = {
             l['Name']: l['Glottocode'] for l in self.etc_dir.read_csv('languages.csv', dicts=True)}
-        liso2gl = {l.iso: l for l in args.glottolog.api.languoids() if l.iso}
+        with stats.stage('glottolog'):
+            liso2gl = self.glottolog_index(args)
+            args.log.info('{0} languoids in Glottolog index'.format(len(liso2gl)))
 
         multichoice = {}
-        for n, cls in PARAM_CLASSES.items():
-            for name, datatype, _, _ in cls().parameters:
-                args.writer.objects['ParameterTable'].append({
-                    'ID': name,
-                    'Name': name.replace('_', ' '),
-                    'Section': n.replace('_', ' '),
-                    'datatype': 'categorical' if isinstance(datatype, (list, tuple)) or datatype == 'multichoice'
-                    else datatype,
-                    'multichoice': datatype == 'multichoice',
-                })
-                if datatype == 'multichoice':
-                    multichoice[name] = set()
-                if isinstance(datatype, (list, tuple)):
-                    for opt in datatype:
-                        args.writer.objects['CodeTable'].append({
-                            'ID': code_id(name, opt),
-                            'Name': opt,
-                            'Parameter_ID': name,
-                        })
-        process_params = {
-            'Vowel reduction processes': 'R',
-            'Consonant allophony processes': 'C',
-        }
-        process_value_pattern = re.compile('(?P<iso>[a-z]{3})-(?P<pid>[RC])(?P<no>[0-9]+)$')
-        for name, id_ in process_params.items():
+        for params in SCHEMA.values():
+            for param in params:
+                args.writer.objects['ParameterTable'].append(param.as_row())
+                if param.multichoice:
+                    multichoice[param.id] = set()
+                for opt, cid in param.codes.items():
+                    args.writer.objects['CodeTable'].append({
+                        'ID': cid,
+                        'Name': opt,
+                        'Parameter_ID': param.id,
+                    })
+        for name, id_ in PROCESS_PARAMS.items():
             args.writer.objects['ParameterTable'].append({
                 'ID': id_,
                 'Name': name,
@@ -115,82 +319,121 @@ class Dataset(BaseDataset):
                 'multichoice': True,
             })
 
-        phonemes = collections.Counter()
-        nval = 0
-        for sec in iter_sections(self.raw_dir / 'data.tex'):
-            glang = liso2gl[sec.iso]
-            lkw = {
-                'ID': sec.iso,
-                'Name': sec.name,
-                'ISO639P3code': sec.iso,
-                'Glottocode': lname2gc.get(sec.name, glang.id),
-                'Latitude': glang.latitude,
-                'Longitude': glang.longitude,
-                'Macroarea': glang.macroareas[0].name,
-                'Source': sec.refs,
-            }
-            args.writer.objects['LanguageTable'].append(lkw)
-            args.writer.cldf.add_sources(*[sources[ref] for ref in sec.refs])
-            data = {k: {} for k in PARAM_CLASSES}
-            for ss in sec.subsections:
-                for item in ss.items:
-                    if sec.iso == 'yue' and item.name == 'N consonant phonemes':
-                        # https://github.com/langsci/249/issues/1
-                        item.name = 'C phoneme inventory'
-
-                    if item.attribute == 'Phonetic_correlates_of_stress' and ss.name != 'Suprasegmentals':
-                        # https://github.com/langsci/249/issues/3
-                        assert sec.name == 'Towa'
-                        data['Suprasegmentals'][item.attribute] = item.value
-                    elif ss.name in data:
-                        data[ss.name][item.attribute] = item.value
-                    else:
-                        assert process_value_pattern.match(item.name) or item.name == 'Notes'
-                        text, refs = convert_text(item.value, warn_only=True)
-                        nval += 1
-                        args.writer.objects['ValueTable'].append({
-                            'ID': str(nval),
-                            'Language_ID': sec.iso,
-                            'Parameter_ID': process_params[ss.name],
-                            'Value': text,
-                            'Comment': item.name,
-                            'Source': format_refs(refs),
-                        })
+        #
+        # Extracting the values of a language section is cached, keyed by a content hash of the
+        # section and the code which does the extraction - i.e. all modules of the `sections`
+        # package, this module and the list of known segments. So we only re-extract what changed.
+        #
+        # Inventories are segmented with the known segments listed in etc/ of this dataset:
+        SEGMENTERS.use(self.etc_dir / 'phonemes.csv')
+        cache = BuildCache(
+            self.cache_dir / 'makecldf',
+            code_version(
+                pathlib.Path(sections.__file__).parent,
+                pathlib.Path(__file__),
+                SEGMENTERS.path),
+            clear=getattr(args, 'full', False))
+        stream = getattr(args, 'stream', False)
+        workers = getattr(args, 'workers', 1)
+        if stats is not NOSTATS and (workers or 1) > 1:
+            args.log.warning('Instrumented builds extract language sections serially')
+            workers = 1
+        # The inventories of all languages - collected for the phoneme index of the matrix only:
+        inventories = collections.OrderedDict()
+        # The keys of all sources cited in the data, in order of first citation:
+        cited = collections.OrderedDict()
+        matrix = MatrixBuilder(SCHEMA) if getattr(args, 'matrix', False) else None
+        db = DatabaseBuilder(self.dir / DATABASE) if getattr(args, 'sqlite', False) else None
+        cube = None
+        if getattr(args, 'cube', False):
+            # The cube is updated incrementally, unless we do a full build:
+            cube = Cube() if getattr(args, 'full', False) else Cube.load(self.dir / CUBE)
+        cube_updates = 0
+        search = SearchIndex() if getattr(args, 'search_index', False) else None
+        # Free-text values are indexed for full-text search:
+        text_params = set(PROCESS_PARAMS.values()).union(
+            param.id for params in SCHEMA.values() for param in params
+            if param.datatype == 'string')
+        templates = TemplateIndex() if getattr(args, 'template_index', False) else None
+        # Value IDs are either running numbers or derived from the content of the values, thus
+        # stable across builds:
+        value_ids = ValueIDs() if getattr(args, 'stable_ids', False) else None
+        # Languages with re-extracted values:
+        touched = set()
+        nlangs = 0
+
+        def iter_values():
+            nonlocal nlangs, cube_updates
+            nval = 0
+            with stats.stage('parse'):
+                secs = iter_sections(self.raw_dir / 'data.tex', memoize=not stream)
+            for sec, (values, refs) in iter_section_values(
+                    stats.iter('parse', secs),
+                    cache,
+                    workers=workers,
+                    stats=stats):
+                glang = liso2gl[sec.iso]
+                lkw = {
+                    'ID': sec.iso,
+                    'Name': sec.name,
+                    'ISO639P3code': sec.iso,
+                    'Glottocode': lname2gc.get(sec.name, glang.id),
+                    'Latitude': glang.latitude,
+                    'Longitude': glang.longitude,
+                    'Macroarea': glang.macroareas[0],
+                    'Source': sec.refs,
+                }
+                args.writer.objects['LanguageTable'].append(lkw)
+                cited.update((ref, None) for ref in sec.refs)
+                cited.update((ref, None) for ref in refs)
+                nlangs += 1
+                stats.count('languages')
+                if sec.fingerprint in cache.written:
+                    touched.add(sec.iso)
+                if cube:
+                    cube_updates += cube.update(sec.iso, lkw['Macroarea'], values)
 
-            data = {k: PARAM_CLASSES[k](**d) for k, d in data.items()}
-            phonemes.update(data['Sound inventory'].C_phoneme_inventory)
-            phonemes.update(data['Sound inventory'].V_phoneme_inventory)
-
-            for n, cls in PARAM_CLASSES.items():
-                for name, datatype, getter, refsgetter in cls().parameters:
-                    v = getter(data[n])
-                    refs = refsgetter(data[n]) if refsgetter else []
-                    if v:
-                        args.writer.cldf.add_sources(*[sources[r[0]] for r in refs])
-                        if datatype == 'multichoice':
-                            for vv in v:
-                                multichoice[name].add(vv)
-                                nval += 1
-                                args.writer.objects['ValueTable'].append({
-                                    'ID': str(nval),
-                                    'Language_ID': sec.iso,
-                                    'Parameter_ID': name,
-                                    'Value': vv,
-                                    'Source': format_refs(refs),
-                                    'Code_ID': code_id(name, vv)
-                                })
-                        else:
-                            nval += 1
-                            kw = {
-                                'ID': str(nval),
-                                'Language_ID': sec.iso,
-                                'Parameter_ID': name,
-                                'Value': v,
-                                'Source': format_refs(refs),
-                            }
-                            if isinstance(datatype, (list, tuple)):
-                                kw['Code_ID'] = code_id(name, v)
-                            args.writer.objects['ValueTable'].append(kw)
+                for v in values:
+                    nval += 1
+                    stats.count('rows')
+                    v = dict(v, ID=value_ids(v) if value_ids else str(nval))
+                    if v['Parameter_ID'] in multichoice:
+                        multichoice[v['Parameter_ID']].add(v['Value'])
+                    if matrix:
+                        matrix.add(v)
+                        if v['Parameter_ID'] in PHONEME_PARAMS:
+                            inventories.setdefault(v['Language_ID'], []).append(v['Value'])
+                    if db:
+                        db.add('value', v)
+                    if search is not None and v['Parameter_ID'] in text_params:
+                        search.add(v['ID'], v['Language_ID'], v['Parameter_ID'], v['Value'])
+                    if templates is not None and \
+                            v['Parameter_ID'] == 'Canonical_syllable_structure':
+                        templates.add(v['Language_ID'], v['Value'])
+                    yield v
+
+        #
+        # Note: The "values" stage includes the "parse" and "extraction" stages - and writing
+        # ValueTable rows when streaming.
+        #
+        with stats.stage('values'):
+            if stream:
+                #
+                # We write ValueTable rows to disk as they are extracted, rather than keeping all
+                # of them in memory until the writer is closed.
+                #
+                table = args.writer.cldf['ValueTable']
+                table.common_props['dc:extent'] = table.write(iter_values())
+            else:
+                args.writer.objects['ValueTable'].extend(iter_values())
+        cache.prune()
+        args.writer.cldf.add_sources(*[sources[ref] for ref in cited])
+        args.log.info('{0} of {1} language sections re-extracted'.format(cache.misses, nlangs))
+        if getattr(args, 'check', False):
+            args.writer.check = True if getattr(args, 'full', False) else touched
+        peak = peak_memory()
+        if peak is not None:
+            args.log.info('peak memory: {0:.1f} MB'.format(peak))
 
         for name, opts in multichoice.items():
             for opt in sorted(opts):
@@ -199,3 +442,48 @@ class Dataset(BaseDataset):
                     'Name': opt,
                     'Parameter_ID': name,
                 })
+
+        if db:
+            for table, name in [
+                ('LanguageTable', 'language'),
+                ('ParameterTable', 'parameter'),
+                ('CodeTable', 'code'),
+            ]:
+                for row in args.writer.objects[table]:
+                    db.add(name, row)
+            db.close()
+            args.log.info('SQLite database written to {0}'.format(DATABASE))
+
+        if cube:
+            removed = cube.retain(lkw['ID'] for lkw in args.writer.objects['LanguageTable'])
+            cube.write(self.dir / CUBE)
+            args.log.info('aggregate cube: {0} languages updated, {1} removed'.format(
+                cube_updates, len(removed)))
+
+        if search is not None:
+            search.write(self.dir / SEARCH_INDEX)
+            args.log.info('{0} values indexed for full-text search'.format(len(search)))
+
+        if templates is not None:
+            templates.write(self.dir / TEMPLATE_INDEX)
+            args.log.info('{0} syllable structure templates indexed'.format(len(templates)))
+
+        if matrix:
+            matrix.write(self.dir / MATRIX_DIR)
+            PhonemeIndex.from_inventories(inventories).write(self.dir / MATRIX_DIR)
+            args.log.info('language x parameter matrix written to {0}'.format(MATRIX_DIR))
+
+        if getattr(args, 'profile_section', None):
+            self.profile_section(args.profile_section)
+
+    def profile_section(self, iso):
+        """
+        Dump cProfile stats for the extraction of values from the section for language `iso`.
+        """
+        for sec in iter_sections(self.raw_dir / 'data.tex'):
+            if sec.iso == iso:
+                profile = cProfile.Profile()
+                profile.runcall(section_values, sec)
+                profile.dump_stats(str(self.dir / 'build-profile-{0}.prof'.format(iso)))
+                return
+        raise ValueError('No section for language {0}'.format(iso))
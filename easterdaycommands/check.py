@@ -0,0 +1,28 @@
+"""
+Check the integrity of the CLDF data of the easterdaysyllablestructure dataset - fast, i.e. without
+a full validation.
+"""
+from sections.check import check, check_templates
+
+from cldfbench_easterdaysyllablestructure import Dataset
+
+
+def register(parser):
+    parser.add_argument(
+        '--language',
+        help="Only check the values of this language (may be given multiple times)",
+        action='append',
+        default=None,
+    )
+
+
+def run(args):
+    languages = set(args.language) if args.language else None
+    for warning in check_templates(Dataset().cldf_dir, languages=languages):
+        args.log.warning(warning)
+    errors = check(Dataset().cldf_dir, languages=languages)
+    for error in errors:
+        args.log.error(error)
+    if not errors:
+        args.log.info('OK')
+    return 1 if errors else 0
@@ -0,0 +1,52 @@
+"""
+Run a build daemon for the easterdaysyllablestructure dataset: It keeps Glottolog index,
+bibliography and parse tree of the appendix in memory, watches raw/ and the code for changes and
+runs builds requested with `cldfbench easterday.rebuild` - much faster than a cold `makecldf`.
+
+The build options given to the daemon - as for `easterday.makecldf` - are used for all builds.
+"""
+import os
+import sys
+import pathlib
+
+import sections
+from sections.daemon import BuildDaemon, RESTART
+
+from easterdaycommands import makecldf
+from cldfbench_easterdaysyllablestructure import Dataset, DAEMON_SOCKET
+
+
+def register(parser):
+    makecldf.register(parser)
+    parser.add_argument(
+        '--socket',
+        help="Path of the Unix socket to listen on - defaults to .cache/{0}".format(DAEMON_SOCKET),
+        type=pathlib.Path,
+        default=None,
+    )
+    parser.add_argument(
+        '--poll',
+        help="Interval in seconds to check for changed files",
+        type=float,
+        default=1.0,
+    )
+
+
+def run(args):
+    ds = Dataset()
+    if not ds.cache_dir.exists():
+        ds.cache_dir.mkdir()
+    daemon = BuildDaemon(
+        ds,
+        args,
+        args.socket or ds.cache_dir / DAEMON_SOCKET,
+        data=[ds.raw_dir, ds.etc_dir / 'languages.csv', ds.etc_dir / 'glottolog.json'],
+        code=[
+            pathlib.Path(sections.__file__).parent,
+            pathlib.Path(sys.modules[Dataset.__module__].__file__),
+            ds.etc_dir / 'phonemes.csv'],
+        poll=args.poll)
+    if daemon.serve() == RESTART:
+        # Changed code can't be reloaded reliably - so we start afresh:
+        args.log.info('restarting')
+        os.execv(sys.executable, [sys.executable] + sys.argv)
@@ -0,0 +1,39 @@
+"""
+Compare the CLDF data of the easterdaysyllablestructure dataset with another build, e.g. a copy of
+the cldf/ directory made before changing the raw data or a converter.
+"""
+import json
+import pathlib
+
+from sections.diff import diff, format_diff
+
+from cldfbench_easterdaysyllablestructure import Dataset
+
+
+def register(parser):
+    parser.add_argument(
+        'old',
+        help="Directory of the CLDF data to compare with",
+        type=pathlib.Path,
+    )
+    parser.add_argument(
+        '--new',
+        help="Directory of the CLDF data to compare - defaults to the dataset's cldf directory",
+        type=pathlib.Path,
+        default=None,
+    )
+    parser.add_argument(
+        '--json',
+        help="Print the differences as JSON",
+        action='store_true',
+        default=False,
+    )
+
+
+def run(args):
+    d = diff(args.old, args.new or Dataset().cldf_dir)
+    if args.json:
+        print(json.dumps(d, indent=2, ensure_ascii=False))
+    else:
+        for line in format_diff(d):
+            print(line)
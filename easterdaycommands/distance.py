@@ -0,0 +1,54 @@
+"""
+List the languages nearest to a language of the easterdaysyllablestructure dataset - by Gower
+distance over the language x parameter matrix written by `makecldf --matrix`.
+"""
+from sections.matrix import Matrix
+from sections.distance import Gower
+
+from cldfbench_easterdaysyllablestructure import Dataset, MATRIX_DIR
+
+
+def register(parser):
+    parser.add_argument(
+        'language',
+        help="Language_ID of the language to list neighbors of",
+    )
+    parser.add_argument(
+        '-k',
+        help="Number of neighbors to list",
+        type=int,
+        default=5,
+    )
+    parser.add_argument(
+        '--section',
+        help="Only compare parameters of this section (may be given multiple times)",
+        action='append',
+        default=None,
+    )
+    parser.add_argument(
+        '--weight',
+        help="Weight of a parameter, as PID=WEIGHT (may be given multiple times; defaults to 1, "
+             "0 ignores the parameter)",
+        action='append',
+        default=[],
+    )
+
+
+def run(args):
+    ds = Dataset()
+    if not (ds.dir / MATRIX_DIR).exists():
+        args.log.error('No matrix found - run makecldf with --matrix first')
+        return 1
+    weights = {}
+    for spec in args.weight:
+        pid, _, weight = spec.partition('=')
+        weights[pid] = float(weight)
+    gower = Gower(
+        Matrix.load(ds.dir / MATRIX_DIR),
+        weights=weights,
+        sections=args.section)
+    if args.language not in gower.matrix.language_index:
+        args.log.error('Unknown language: {0}'.format(args.language))
+        return 1
+    for lid, d in gower.nearest(args.language, k=args.k):
+        print('{0}\t{1:.4f}'.format(lid, d))
@@ -0,0 +1,26 @@
+"""
+Download the raw data for the easterdaysyllablestructure dataset - conditionally, i.e. only
+re-writing files which changed upstream.
+"""
+from cldfbench.cli_util import with_dataset
+
+from cldfbench_easterdaysyllablestructure import Dataset, BASE_URL
+
+
+def register(parser):
+    parser.add_argument(
+        '--base-url',
+        help="URL or local directory to download the files from, e.g. a local mirror of the "
+             "upstream repository",
+        default=BASE_URL,
+    )
+    parser.add_argument(
+        '--force',
+        help="Re-write all files, disregarding ETags and hashes recorded in raw/manifest.json",
+        action='store_true',
+        default=False,
+    )
+
+
+def run(args):
+    with_dataset(args, 'download', dataset=Dataset())
@@ -0,0 +1,107 @@
+"""
+Run makecldf for the easterdaysyllablestructure dataset, with dataset-specific build options.
+"""
+from cldfbench.cli_util import with_dataset, add_catalog_spec, IGNORE_MISSING
+
+from cldfbench_easterdaysyllablestructure import Dataset
+
+
+def register(parser):
+    add_catalog_spec(parser, 'glottolog', default=IGNORE_MISSING)
+    parser.add_argument(
+        '--offline',
+        help="Read Glottolog data from the snapshot in etc/ rather than from a Glottolog clone",
+        action='store_true',
+        default=False,
+    )
+    parser.add_argument(
+        '--glottolog-snapshot',
+        help="Write the Glottolog index used for the build to etc/ as snapshot for offline builds",
+        action='store_true',
+        default=False,
+    )
+    parser.add_argument(
+        '--full',
+        help="Re-extract all language sections, ignoring the build cache",
+        action='store_true',
+        default=False,
+    )
+    parser.add_argument(
+        '--workers',
+        help="Number of worker processes to extract language sections in parallel",
+        type=int,
+        default=1,
+    )
+    parser.add_argument(
+        '--stream',
+        help="Write ValueTable rows to disk as language sections are processed, keeping memory "
+             "use flat",
+        action='store_true',
+        default=False,
+    )
+    parser.add_argument(
+        '--stable-ids',
+        help="Derive ValueTable IDs from language, parameter and code or value - rather than "
+             "numbering values - so that unchanged values keep their IDs across builds",
+        action='store_true',
+        default=False,
+    )
+    parser.add_argument(
+        '--matrix',
+        help="Also write the values as binary language x parameter matrix and the phoneme "
+             "inventories as language x phoneme bit matrix to matrix/ (requires numpy)",
+        action='store_true',
+        default=False,
+    )
+    parser.add_argument(
+        '--sqlite',
+        help="Also write the data to an indexed SQLite database easterday.sqlite",
+        action='store_true',
+        default=False,
+    )
+    parser.add_argument(
+        '--cube',
+        help="Also update the aggregate of coded values by macroarea and complexity category in "
+             "cube.json",
+        action='store_true',
+        default=False,
+    )
+    parser.add_argument(
+        '--search-index',
+        help="Also write an inverted index of free-text values for full-text search to "
+             "search-index.json",
+        action='store_true',
+        default=False,
+    )
+    parser.add_argument(
+        '--template-index',
+        help="Also write an index of the shapes licensed by the canonical syllable structure "
+             "templates to template-index.json",
+        action='store_true',
+        default=False,
+    )
+    parser.add_argument(
+        '--check',
+        help="Run the fast integrity check on the written data - for the values of re-extracted "
+             "languages only, unless --full is given",
+        action='store_true',
+        default=False,
+    )
+    parser.add_argument(
+        '--report',
+        help="Write timings per build stage and call counts for converters and parameter getters "
+             "to build-report.json",
+        action='store_true',
+        default=False,
+    )
+    parser.add_argument(
+        '--profile-section',
+        metavar='ISO',
+        help="Dump cProfile stats for the extraction of the section of language ISO to "
+             "build-profile-ISO.prof",
+        default=None,
+    )
+
+
+def run(args):
+    with_dataset(args, 'makecldf', dataset=Dataset())
@@ -0,0 +1,56 @@
+"""
+Rebuild the CLDF data of the easterdaysyllablestructure dataset, using a running build daemon (see
+`cldfbench easterday.daemon`), and report the latency of the build and its diagnostics.
+"""
+import pathlib
+
+from sections.daemon import request
+
+from cldfbench_easterdaysyllablestructure import Dataset, DAEMON_SOCKET
+
+
+def register(parser):
+    parser.add_argument(
+        '--socket',
+        help="Path of the Unix socket the daemon listens on - defaults to .cache/{0}".format(
+            DAEMON_SOCKET),
+        type=pathlib.Path,
+        default=None,
+    )
+    parser.add_argument(
+        '--full',
+        help="Re-extract the values of all language sections",
+        action='store_true',
+        default=False,
+    )
+    parser.add_argument(
+        '--check',
+        help="Run the fast integrity check on the written data",
+        action='store_true',
+        default=False,
+    )
+    parser.add_argument(
+        '--stop',
+        help="Stop the daemon",
+        action='store_true',
+        default=False,
+    )
+
+
+def run(args):
+    path = args.socket or Dataset().cache_dir / DAEMON_SOCKET
+    try:
+        if args.stop:
+            request(path, 'stop')
+            return
+        res = request(
+            path,
+            'build',
+            **{k: True for k in ['full', 'check'] if getattr(args, k)})
+    except (ConnectionError, OSError):
+        args.log.error('No daemon listening on {0}'.format(path))
+        return 1
+    for message in res['diagnostics']:
+        print(message)
+    args.log.info('{0} in {1:.2f}s'.format('built' if res['ok'] else 'failed', res['latency']))
+    return 0 if res['ok'] else 1
@@ -0,0 +1,75 @@
+"""
+Syllabify a word list, using the phonotactics of the languages in the easterdaysyllablestructure
+dataset, i.e. inventories, canonical syllable structure, sizes of maximal onset and coda and
+obligatory onsets and codas.
+
+The word list is read from a file - or stdin - with one word per line, given as
+"Language_ID<TAB>word" - or just as "word", with --language. Words are transcribed with the
+phonemes of the language's inventories, optionally separated by spaces. The output has lines
+"Language_ID<TAB>word<TAB>syllables", with syllables separated by "." - and empty if the word
+can't be syllabified.
+"""
+import sys
+import pathlib
+import contextlib
+
+from sections.syllabify import load_syllabifiers, syllabify, Throughput
+
+from cldfbench_easterdaysyllablestructure import Dataset
+
+
+def register(parser):
+    parser.add_argument(
+        'words',
+        help="Path of the word list or '-' to read from stdin",
+    )
+    parser.add_argument(
+        '--language',
+        help="Language_ID of all words in the word list",
+        default=None,
+    )
+    parser.add_argument(
+        '--workers',
+        help="Number of worker processes to syllabify words in",
+        type=int,
+        default=1,
+    )
+    parser.add_argument(
+        '--report',
+        help="Report the throughput every REPORT words",
+        type=int,
+        default=100000,
+    )
+
+
+def iter_words(lines, language=None):
+    for line in lines:
+        line = line.rstrip('\r\n')
+        if line.strip():
+            if language:
+                yield language, line.strip()
+            else:
+                lid, _, word = line.partition('\t')
+                yield lid, word.strip()
+
+
+def run(args):
+    ds = Dataset()
+    syllabifiers = load_syllabifiers(ds.cldf_dir, ds.cache_dir / 'syllabify')
+    if args.language and args.language not in syllabifiers:
+        args.log.error('No phonotactics for language {0}'.format(args.language))
+        return 1
+    throughput, report = Throughput(), args.report
+    with contextlib.ExitStack() as stack:
+        lines = sys.stdin if args.words == '-' else \
+            stack.enter_context(pathlib.Path(args.words).open(encoding='utf8'))
+        for lid, word, syllables in syllabify(
+                iter_words(lines, language=args.language),
+                syllabifiers,
+                workers=args.workers,
+                throughput=throughput):
+            print('{0}\t{1}\t{2}'.format(lid, word, '.'.join(syllables or [])))
+            if args.report and throughput.words >= report:
+                args.log.info(str(throughput))
+                report += args.report
+    args.log.info(str(throughput))
@@ -9,7 +9,7 @@ import attr
 from .util import *
 
 
-@attr.s
+@attr.s(frozen=True, slots=True)
 class Morphology(object):
     Synthetic_index = attr.ib(
         default=None,
@@ -3,6 +3,7 @@ import re
 import attr
 
 from .util import *
+from .segments import SEGMENTERS
 
 
 MANNERS = {
@@ -22,6 +23,7 @@ PLACES = {
     'Palato-Alveolar': 'Palato-alveolar',
 }
 
+AMOUNTS = ['All', 'Some', 'None']
 VOICING_CONTRASTS = {
     'Obstruent': 'Obstruents',
 }
@@ -43,20 +45,20 @@ def convert_other_contrasts(s):
     return s, amount
 
 
-@attr.s
+@attr.s(frozen=True, slots=True)
 class Sound_inventory(object):
     C_phoneme_inventory = attr.ib(
         default=None,
-        converter=lambda s: s.split() if s else [])
+        converter=lambda s: SEGMENTERS['Consonant_inventory'](s) if s else [])
     Contrastive_length = attr.ib(
         default=None,
         converter=lambda s: ('Some' if s == 'Yes' else s) if s else None,
-        validator=attr.validators.optional(attr.validators.in_(['All', 'Some', 'None'])),
+        validator=one_of(AMOUNTS),
     )
     Contrastive_nasalization = attr.ib(
         default=None,
         converter=lambda s: ('Some' if s == 'Yes' else s) if s else None,
-        validator=attr.validators.optional(attr.validators.in_(['All', 'Some', 'None'])),
+        validator=one_of(AMOUNTS),
     )
     Diphthongs_or_vowel_sequences = attr.ib(
         default=None,
@@ -68,7 +70,7 @@ class Sound_inventory(object):
     )
     Geminates = attr.ib(
         default=None,
-        converter=lambda s: None if (s == 'N/A' or (not s)) else s.split('(')[0].strip().split(),
+        converter=lambda s: None if (s == 'N/A' or (not s)) else SEGMENTERS['Geminate_inventory'](s.split('(')[0]),
     )
     Manners = attr.ib(
         default=None,
@@ -97,7 +99,7 @@ class Sound_inventory(object):
     )
     V_phoneme_inventory = attr.ib(
         default=None,
-        converter=lambda s: s.split() if s else [])
+        converter=lambda s: SEGMENTERS['Vowel_inventory'](s) if s else [])
     Voicing_contrasts = attr.ib(
         default=None,
         converter=lambda s: None if (not s or (s == 'None')) else [VOICING_CONTRASTS.get(ss.strip(), ss.strip()) for ss in s.split(',')],
@@ -149,13 +151,13 @@ class Sound_inventory(object):
             ),
             (
                 'Contrastive_length',
-                attr.fields_dict(Sound_inventory)['Contrastive_length'].validator.validator.options,
+                AMOUNTS,
                 lambda i: i.Contrastive_length,
                 None
             ),
             (
                 'Contrastive_nasalization',
-                attr.fields_dict(Sound_inventory)['Contrastive_nasalization'].validator.validator.options,
+                AMOUNTS,
                 lambda i: i.Contrastive_nasalization,
                 None
             ),
@@ -171,7 +173,8 @@ class Sound_inventory(object):
 
     def __attrs_post_init__(self):
         if self.C_phoneme_inventory and not self.N_consonant_phonemes:
-            self.N_consonant_phonemes = len(self.C_phoneme_inventory)
+            # The class is frozen, so we must bypass its __setattr__:
+            object.__setattr__(self, 'N_consonant_phonemes', len(self.C_phoneme_inventory))
         if not (self.N_consonant_phonemes or 0) in [len(self.C_phoneme_inventory), len(self.Geminates or [])]:
             raise ValueError(' '.join(self.C_phoneme_inventory))
 
@@ -182,11 +185,11 @@ class Sound_inventory(object):
             return (d, v, c)
         m = re.search('Diphthong(s)?\s+(?P<d>[^V(]+)', s)
         if m:
-            d = m.group('d').strip().split()
+            d = SEGMENTERS['Diphtong_inventory'](m.group('d'))
             s = s[:m.start()] + s[m.end():]
         m = re.search('Vowel sequence(s)?\s+(?P<v>[^D(]+)', s)
         if m:
-            v = m.group('v').strip().split()
+            v = SEGMENTERS['Vowel_sequence_inventory'](m.group('v'))
             s = s[:m.start()] + s[m.end():]
         s = s.strip()
         if s.startswith('(') and s.endswith(')'):
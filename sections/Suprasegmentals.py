@@ -16,6 +16,8 @@ STRESS_PLACEMENT = {
     'Other (tone and weight)': 'Other (tone and weight)',
 }
 
+TONE = ['No', 'Not reported', 'Yes']
+
 
 def convert_word_stress(s):
     if not s:
@@ -33,7 +35,7 @@ def convert_word_stress(s):
     return s, comment, refs
 
 
-@attr.s
+@attr.s(frozen=True, slots=True)
 class Suprasegmentals(object):
     # (none) / Not described
     Differences_in_phonological_properties_of_stressed_and_unstressed_syllables = attr.ib(default=None)
@@ -48,11 +50,11 @@ class Suprasegmentals(object):
     )
     Stress_placement = attr.ib(
         default=None,
-        validator=attr.validators.optional(attr.validators.in_(list(STRESS_PLACEMENT.values())))
+        validator=one_of(STRESS_PLACEMENT.values())
     )
     Tone = attr.ib(
         default=None,
-        validator=attr.validators.optional(attr.validators.in_(['No', 'Not reported', 'Yes']))
+        validator=one_of(TONE)
     )
     Word_stress = attr.ib(default=None, converter=convert_word_stress)
 
@@ -80,7 +82,7 @@ class Suprasegmentals(object):
                 None),
             (
                 'Tone',
-                attr.fields_dict(Suprasegmentals)['Tone'].validator.validator.options,
+                TONE,
                 lambda i: i.Tone,
                 None),
             (
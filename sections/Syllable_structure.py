@@ -24,7 +24,11 @@ import attr
 from clldutils.text import strip_chars
 
 from .util import *
+from .templates import compile_template
 
+COMPLEXITY_CATEGORIES = ['Highly Complex', 'Moderately Complex', 'Complex', 'Simple']
+CODA_OBLIGATORY = ['N/A', 'No', 'Yes']
+ONSET_OBLIGATORY = ['No', 'Yes']
 SCP = {
     'Obstruent (Conflicting reports)': 'Obstruent (Conflicting)',
 }
@@ -40,10 +44,12 @@ def convert_canonical_syllable_structure(s):
     rem = strip_chars('(),;.', rem).strip()
     if rem:
         raise ValueError(rem)
+    # Make sure the template is well-formed:
+    compile_template(m.group('t'))
     return m.group('t'), refs
 
 
-@attr.s
+@attr.s(frozen=True, slots=True)
 class Syllable_structure(object):
     Canonical_syllable_structure = attr.ib(
         default=None,
@@ -51,7 +57,7 @@ class Syllable_structure(object):
     )
     Coda_obligatory = attr.ib(
         default=None,
-        validator=attr.validators.optional(attr.validators.in_(['N/A', 'No', 'Yes'])),
+        validator=one_of(CODA_OBLIGATORY),
     )
     Coda_restrictions = attr.ib(
         default=None,
@@ -59,8 +65,7 @@ class Syllable_structure(object):
     )
     Complexity_category = attr.ib(
         default=None,
-        validator=attr.validators.optional(
-            attr.validators.in_(['Highly Complex', 'Moderately Complex', 'Complex', 'Simple'])),
+        validator=one_of(COMPLEXITY_CATEGORIES),
     )
     Morphological_constituency_of_maximal_syllable_margin = attr.ib(default=None)
     Morphological_pattern_of_syllabic_consonants = attr.ib(default=None)
@@ -68,7 +73,7 @@ class Syllable_structure(object):
     Nucleus = attr.ib(default=None)
     Onset_obligatory = attr.ib(
         default=None,
-        validator=attr.validators.optional(attr.validators.in_(['No', 'Yes'])),
+        validator=one_of(ONSET_OBLIGATORY),
     )
     Onset_restrictions = attr.ib(
         default=None,
@@ -112,17 +117,17 @@ class Syllable_structure(object):
                 lambda i: i.Size_of_maximal_word_marginal_sequences_with_syllabic_obstruents, None),
             (
                 'Complexity_category',
-                attr.fields_dict(Syllable_structure)['Complexity_category'].validator.validator.options,
+                COMPLEXITY_CATEGORIES,
                 lambda i: i.Complexity_category,
                 None),
             (
                 'Onset_obligatory',
-                attr.fields_dict(Syllable_structure)['Onset_obligatory'].validator.validator.options,
+                ONSET_OBLIGATORY,
                 lambda i: i.Onset_obligatory,
                 None),
             (
                 'Coda_obligatory',
-                attr.fields_dict(Syllable_structure)['Coda_obligatory'].validator.validator.options,
+                CODA_OBLIGATORY,
                 lambda i: i.Coda_obligatory,
                 None),
             (
@@ -2,7 +2,11 @@ from .Morphology import Morphology
 from .Suprasegmentals import Suprasegmentals
 from .Sound_inventory import Sound_inventory
 from .Syllable_structure import Syllable_structure
+from .schema import compile_schema
 
 PARAM_CLASSES = {
     cls.__name__.replace('_', ' '): cls
     for cls in [Morphology, Sound_inventory, Suprasegmentals, Syllable_structure]}
+
+# The parameter schema, compiled once at import time:
+SCHEMA = compile_schema(PARAM_CLASSES)
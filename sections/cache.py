@@ -0,0 +1,125 @@
+"""
+A simple on-disk cache for the results of extracting data from language sections.
+
+Cache entries are keyed by a content hash of the section, and the whole cache is invalidated
+when the code doing the extraction changes. Each entry is stored in a file of its own, so the
+cache doesn't need to be held in memory.
+"""
+import json
+import shutil
+import hashlib
+import collections
+
+from pycldf.sources import Source
+
+__all__ = ['BuildCache', 'code_version', 'read_bib']
+
+# The sources read last in this process, keyed by path and hash of the BibTeX file:
+_SOURCES = {}
+
+
+def code_version(*paths):
+    """
+    Compute a hash over the Python source files in `paths` - files or directories, e.g. packages,
+    which are searched recursively, so every module of a package is covered.
+    """
+    md5 = hashlib.md5()
+    for p in paths:
+        if p.is_dir():
+            files = [
+                (f.relative_to(p).as_posix(), f) for f in sorted(p.rglob('*.py'))
+                if '__pycache__' not in f.parts]
+        else:
+            files = [(p.name, p)]
+        for name, f in files:
+            md5.update(name.encode('utf8'))
+            md5.update(f.read_bytes())
+    return md5.hexdigest()
+
+
+def read_bib(datadir, fname, cache_dir):
+    """
+    Read a BibTeX file from `datadir`, re-using the parsed entries cached in `cache_dir` - or read
+    before in this process - if the file didn't change.
+
+    :return: `OrderedDict` mapping keys to `pycldf.sources.Source` instances.
+    """
+    md5 = hashlib.md5((datadir / fname).read_bytes()).hexdigest()
+    key = (str((datadir / fname).resolve()), md5)
+    if key not in _SOURCES:
+        _SOURCES.clear()
+        _SOURCES[key] = _read_bib(datadir, fname, cache_dir, md5)
+    return _SOURCES[key]
+
+
+def _read_bib(datadir, fname, cache_dir, md5):
+    cached = cache_dir / '{0}-{1}.json'.format(fname, md5)
+    if cached.exists():
+        with cached.open(encoding='utf8') as fp:
+            return collections.OrderedDict(
+                (id_, Source(genre, id_, _check_id=False, **collections.OrderedDict(fields)))
+                for genre, id_, fields in json.load(fp))
+
+    res = collections.OrderedDict((src.id, src) for src in datadir.read_bib(fname))
+    if not cache_dir.exists():
+        cache_dir.mkdir(parents=True)
+    for p in cache_dir.glob('{0}-*.json'.format(fname)):
+        p.unlink()
+    with cached.open('w', encoding='utf8') as fp:
+        json.dump(
+            [[src.genre, src.id, list(src.items())] for src in res.values()],
+            fp,
+            ensure_ascii=False)
+    return res
+
+
+class BuildCache(object):
+    def __init__(self, path, version, clear=False):
+        """
+        :param path: Directory in which to store cache entries.
+        :param version: Version of the code creating cache entries. Only entries created with the \
+        same version are re-used.
+        :param clear: Flag signaling whether to disregard all existing entries.
+        """
+        self.path = path
+        self.version = version
+        self.misses = 0
+        # Keys of the entries (re-)created in this run:
+        self.written = set()
+        self._used = set()
+        if clear and path.exists():
+            shutil.rmtree(str(path))
+        if path.exists():
+            # Remove entries created by different versions of the code:
+            for p in path.iterdir():
+                if p.name != version:
+                    shutil.rmtree(str(p))
+        self._dir = path / version
+        if not self._dir.exists():
+            self._dir.mkdir(parents=True)
+
+    def _path(self, key):
+        return self._dir / '{0}.json'.format(key)
+
+    def __contains__(self, key):
+        return key in self._used or self._path(key).exists()
+
+    def __getitem__(self, key):
+        self._used.add(key)
+        with self._path(key).open(encoding='utf8') as fp:
+            return json.load(fp)
+
+    def __setitem__(self, key, value):
+        self.misses += 1
+        self.written.add(key)
+        self._used.add(key)
+        with self._path(key).open('w', encoding='utf8') as fp:
+            json.dump(value, fp, ensure_ascii=False)
+
+    def prune(self):
+        """
+        Remove all entries which have not been accessed.
+        """
+        for p in self._dir.iterdir():
+            if p.stem not in self._used:
+                p.unlink()
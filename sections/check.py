@@ -0,0 +1,135 @@
+"""
+A fast integrity check of the CLDF data, complementing the full validation with `pycldf`.
+
+We read the IDs of languages, parameters, codes and sources into hash sets once, and then check
+the rows of the ValueTable in one pass over the CSV file for
+- valid foreign keys, i.e. Language_ID, Parameter_ID, Code_ID and Source,
+- Code_IDs of categorical parameters pointing to codes of the right parameter,
+- no more than one value per language for parameters which are not multichoice.
+
+`check_templates` checks the sizes of maximal onset and coda against the compiled canonical
+syllable structure templates - in one pass over the ValueTable, too.
+"""
+import re
+import csv
+import json
+import collections
+
+from .templates import compile_template
+
+__all__ = ['check', 'check_templates']
+
+TERMS = 'http://cldf.clld.org/v1.0/terms.rdf#'
+BIB_KEY_PATTERN = re.compile(r'@[a-zA-Z]+\{(?P<key>[^,\s]+),')
+SOURCE_PATTERN = re.compile(r'(?P<key>[^\[]+)(\[(?P<pages>[^\]]*)\])?$')
+
+
+def _tables(cldf_dir, metadata='StructureDataset-metadata.json'):
+    with cldf_dir.joinpath(metadata).open(encoding='utf8') as fp:
+        md = json.load(fp)
+    return {
+        t['dc:conformsTo'].replace(TERMS, ''): cldf_dir / t['url']
+        for t in md['tables'] if t.get('dc:conformsTo')}, cldf_dir / md.get('dc:source', '')
+
+
+def _rows(path):
+    with path.open(encoding='utf8', newline='') as fp:
+        yield from csv.DictReader(fp)
+
+
+def _source_keys(refs):
+    for ref in refs.split(';') if refs else []:
+        yield SOURCE_PATTERN.match(ref).group('key')
+
+
+def check(cldf_dir, languages=None):
+    """
+    :param languages: Optional collection of Language_IDs to restrict the check of values to, \
+    e.g. the languages touched by an incremental build.
+    :return: `list` of error messages.
+    """
+    tables, bib = _tables(cldf_dir)
+    errors = []
+
+    sources = set()
+    if bib.is_file():
+        with bib.open(encoding='utf8') as fp:
+            for line in fp:
+                m = BIB_KEY_PATTERN.match(line)
+                if m:
+                    sources.add(m.group('key'))
+
+    lids = set()
+    for row in _rows(tables['LanguageTable']):
+        lids.add(row['ID'])
+        if languages is None or row['ID'] in languages:
+            for key in _source_keys(row.get('Source')):
+                if key not in sources:
+                    errors.append('LanguageTable {0}: unknown source {1}'.format(row['ID'], key))
+
+    params = {
+        row['ID']: (row['datatype'] == 'categorical', row['multichoice'] == 'yes')
+        for row in _rows(tables['ParameterTable'])}
+    codes = {row['ID']: row['Parameter_ID'] for row in _rows(tables['CodeTable'])}
+    for cid, pid in codes.items():
+        if pid not in params:
+            errors.append('CodeTable {0}: unknown parameter {1}'.format(cid, pid))
+
+    seen = collections.Counter()
+    for row in _rows(tables['ValueTable']):
+        lid, pid, cid = row['Language_ID'], row['Parameter_ID'], row['Code_ID']
+        if languages is not None and lid not in languages:
+            continue
+        prefix = 'ValueTable {0}:'.format(row['ID'])
+        if lid not in lids:
+            errors.append('{0} unknown language {1}'.format(prefix, lid))
+        if pid not in params:
+            errors.append('{0} unknown parameter {1}'.format(prefix, pid))
+            continue
+        categorical, multichoice = params[pid]
+        if cid:
+            if cid not in codes:
+                errors.append('{0} unknown code {1}'.format(prefix, cid))
+            elif codes[cid] != pid:
+                errors.append('{0} code {1} of wrong parameter'.format(prefix, cid))
+        elif categorical:
+            errors.append('{0} missing code for categorical parameter {1}'.format(prefix, pid))
+        if not multichoice:
+            seen[lid, pid] += 1
+            if seen[lid, pid] == 2:
+                errors.append('{0} multiple values for {1} {2}'.format(prefix, lid, pid))
+        for key in _source_keys(row['Source']):
+            if key not in sources:
+                errors.append('{0} unknown source {1}'.format(prefix, key))
+    return errors
+
+
+def check_templates(cldf_dir, languages=None):
+    """
+    :param languages: Optional collection of Language_IDs to restrict the check to.
+    :return: `list` of messages about sizes of maximal onset or coda contradicting the template.
+    """
+    tables, _ = _tables(cldf_dir)
+    # Maps the size parameters to the corresponding attributes of compiled templates:
+    sizes = collections.OrderedDict([
+        ('Size_of_maximal_onset', 'max_onset'),
+        ('Size_of_maximal_coda', 'max_coda'),
+    ])
+    data = collections.defaultdict(dict)
+    for row in _rows(tables['ValueTable']):
+        if row['Parameter_ID'] in sizes or row['Parameter_ID'] == 'Canonical_syllable_structure':
+            if languages is None or row['Language_ID'] in languages:
+                data[row['Language_ID']][row['Parameter_ID']] = row['Value']
+
+    messages = []
+    for lid, values in sorted(data.items()):
+        if 'Canonical_syllable_structure' not in values:
+            continue
+        template = compile_template(values['Canonical_syllable_structure'])
+        for pid, name in sizes.items():
+            # Missing sizes are not reported, i.e. are not taken to be 0:
+            expected = getattr(template, name) or 0
+            if pid in values and int(values[pid]) != expected:
+                messages.append('{0}: {1} {2} contradicts template {3} ({4})'.format(
+                    lid, pid, values[pid], template.template, expected))
+    return messages
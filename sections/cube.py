@@ -0,0 +1,144 @@
+"""
+A materialized aggregate of the coded values: parameter x code x macroarea x complexity category,
+with the languages in each cell.
+
+The cube also keeps the contribution of each language, so it can be updated incrementally:
+When the values of a language change, its old contribution is subtracted from the cells and the
+new one added.
+"""
+import json
+import collections
+
+__all__ = ['Cube']
+
+COMPLEXITY_PARAM = 'Complexity_category'
+
+
+class Cube(object):
+    def __init__(self):
+        # Maps Parameter_ID to `dict` mapping (Code_ID, macroarea, complexity) to `set` of
+        # Language_IDs:
+        self.cells = collections.defaultdict(dict)
+        # Maps Language_ID to (macroarea, complexity, frozenset of (Parameter_ID, Code_ID)):
+        self.contributions = {}
+
+    @staticmethod
+    def contribution(macroarea, values):
+        """
+        :param values: ValueTable rows of one language.
+        """
+        complexity = None
+        for v in values:
+            if v['Parameter_ID'] == COMPLEXITY_PARAM:
+                complexity = v['Value']
+        return (
+            macroarea,
+            complexity,
+            frozenset((v['Parameter_ID'], v['Code_ID']) for v in values if v.get('Code_ID')))
+
+    def _apply(self, lid, contribution, add=True):
+        macroarea, complexity, codes = contribution
+        for pid, cid in codes:
+            cells = self.cells[pid]
+            key = (cid, macroarea, complexity)
+            if add:
+                cells.setdefault(key, set()).add(lid)
+            else:
+                cells[key].discard(lid)
+                if not cells[key]:
+                    del cells[key]
+
+    def update(self, lid, macroarea, values):
+        """
+        Update the cube with the values of language `lid`.
+
+        :return: `bool` flag signaling whether the cube changed.
+        """
+        contribution = self.contribution(macroarea, values)
+        old = self.contributions.get(lid)
+        if old == contribution:
+            return False
+        if old:
+            self._apply(lid, old, add=False)
+        self._apply(lid, contribution)
+        self.contributions[lid] = contribution
+        return True
+
+    def remove(self, lid):
+        self._apply(lid, self.contributions.pop(lid), add=False)
+
+    def retain(self, lids):
+        """
+        Remove the contributions of all languages not in `lids`.
+
+        :return: `list` of removed Language_IDs.
+        """
+        removed = sorted(set(self.contributions) - set(lids))
+        for lid in removed:
+            self.remove(lid)
+        return removed
+
+    def languages(self, pid, cid=None, macroarea=None, complexity=None):
+        """
+        :return: `set` of Language_IDs with code `cid` for parameter `pid` - or any code if \
+        `cid is None` - restricted to `macroarea` and `complexity` if given.
+        """
+        res = set()
+        for (c, ma, cc), lids in self.cells.get(pid, {}).items():
+            if (cid is None or c == cid) and \
+                    (macroarea is None or ma == macroarea) and \
+                    (complexity is None or cc == complexity):
+                res |= lids
+        return res
+
+    def count(self, pid, cid=None, macroarea=None, complexity=None):
+        return len(self.languages(pid, cid=cid, macroarea=macroarea, complexity=complexity))
+
+    def summary(self, pid, by=None):
+        """
+        Code frequencies for parameter `pid`, i.e. numbers of languages per code.
+
+        :param by: `None`, "macroarea" or "complexity" - the dimension to break counts down by.
+        :return: `OrderedDict` mapping Code_IDs to counts or - if `by` is specified - to \
+        `OrderedDict` s mapping macroareas or complexity categories to counts.
+        """
+        groups = collections.defaultdict(lambda: collections.defaultdict(set))
+        for (cid, ma, cc), lids in self.cells.get(pid, {}).items():
+            groups[cid][{None: None, 'macroarea': ma, 'complexity': cc}[by]] |= lids
+        res = collections.OrderedDict()
+        for cid in sorted(groups):
+            if by is None:
+                res[cid] = len(groups[cid][None])
+            else:
+                res[cid] = collections.OrderedDict(
+                    (k, len(v)) for k, v in sorted(groups[cid].items(), key=lambda i: str(i[0])))
+        return res
+
+    @classmethod
+    def load(cls, path):
+        cube = cls()
+        if path.exists():
+            with path.open(encoding='utf8') as fp:
+                d = json.load(fp)
+            for lid, (ma, cc, codes) in d['languages'].items():
+                cube.contributions[lid] = (ma, cc, frozenset(tuple(c) for c in codes))
+            for pid, cid, ma, cc, lids in d['cells']:
+                cube.cells[pid][(cid, ma, cc)] = set(lids)
+        return cube
+
+    def write(self, path):
+        with path.open('w', encoding='utf8') as fp:
+            json.dump(
+                collections.OrderedDict([
+                    ('languages', collections.OrderedDict(
+                        (lid, [ma, cc, sorted(codes)])
+                        for lid, (ma, cc, codes) in sorted(self.contributions.items()))),
+                    ('cells', sorted(
+                        (
+                            [pid, cid, ma, cc, sorted(lids)]
+                            for pid, cells in self.cells.items()
+                            for (cid, ma, cc), lids in cells.items()),
+                        key=lambda r: [str(c) for c in r[:4]])),
+                ]),
+                fp,
+                ensure_ascii=False)
@@ -0,0 +1,196 @@
+"""
+A long-running build process, which keeps what each build needs - imported code, Glottolog index,
+bibliography and parse tree of the appendix - in memory, and runs builds upon requests sent over a
+local Unix socket.
+
+Requests and responses are JSON objects, sent as one line each:
+
+- {"command": "build", "options": {...}} runs `makecldf` - with the options overriding the build
+  options the daemon was started with - and is answered with the build latency in seconds and the
+  diagnostics, i.e. the warnings and errors logged during the build:
+  {"ok": true, "latency": 0.8, "diagnostics": []}
+- {"command": "ping"} checks whether the daemon is listening,
+- {"command": "stop"} stops the daemon.
+
+In between requests, the daemon polls the data and code files for changes: Changed data is loaded
+into memory right away, changed code makes the daemon exit with `RESTART`, to be started again.
+"""
+import json
+import time
+import socket
+import logging
+import argparse
+
+__all__ = ['BuildDaemon', 'request', 'RESTART']
+
+RESTART = 'restart'
+
+
+def snapshot(paths):
+    """
+    :param paths: Iterable of files or directories.
+    :return: `dict` mapping the paths of the files - in directories, recursively - to pairs \
+    (mtime, size).
+    """
+    res = {}
+    for path in paths:
+        for p in sorted(path.rglob('*')) if path.is_dir() else [path]:
+            if p.is_file() and '__pycache__' not in p.parts:
+                stat = p.stat()
+                res[str(p)] = (stat.st_mtime_ns, stat.st_size)
+    return res
+
+
+class Diagnostics(logging.Handler):
+    """
+    Collects the messages of warnings and errors logged during a build.
+    """
+    def __init__(self):
+        super().__init__(level=logging.WARNING)
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append('{0}: {1}'.format(record.levelname, record.getMessage()))
+
+
+class BuildDaemon(object):
+    def __init__(self, dataset, args, socket_path, data, code, poll=1.0):
+        """
+        :param dataset: The `Dataset` to build - implementing `warm(args)`.
+        :param args: `argparse.Namespace` of default build options.
+        :param socket_path: Path of the Unix socket to listen on.
+        :param data: Data files or directories to watch, e.g. raw/.
+        :param code: Code files or directories to watch, e.g. sections/.
+        :param poll: Interval in seconds to poll for changed files.
+        """
+        self.dataset = dataset
+        self.args = args
+        self.socket_path = socket_path
+        self.poll = poll
+        self.data, self.code = data, code
+        self._data, self._code = snapshot(data), snapshot(code)
+
+    def warm(self):
+        start = time.perf_counter()
+        self.dataset.warm(self.args)
+        self.args.log.info('warmed up in {0:.2f}s'.format(time.perf_counter() - start))
+
+    def build(self, options=None):
+        """
+        :return: `dict` with keys "ok", "latency" and "diagnostics".
+        """
+        options = options or {}
+        unknown = sorted(k for k in options if not hasattr(self.args, k))
+        if unknown:
+            return {
+                'ok': False,
+                'latency': 0.0,
+                'diagnostics': ['ERROR: unknown option(s) {0}'.format(', '.join(unknown))]}
+        args = argparse.Namespace(**dict(vars(self.args), **options))
+        diagnostics = Diagnostics()
+        args.log.addHandler(diagnostics)
+        start, ok = time.perf_counter(), True
+        try:
+            self.dataset._cmd_makecldf(args)
+        except Exception as e:  # Build failures are reported as diagnostics.
+            ok = False
+            diagnostics.messages.append('ERROR: {0}: {1}'.format(type(e).__name__, e))
+        finally:
+            args.log.removeHandler(diagnostics)
+        return {
+            'ok': ok,
+            'latency': round(time.perf_counter() - start, 3),
+            'diagnostics': diagnostics.messages}
+
+    def changes(self):
+        """
+        Check for changed files - loading changed data into memory right away.
+
+        :return: `RESTART` if code changed, else `None`.
+        """
+        code = snapshot(self.code)
+        if code != self._code:
+            self.args.log.info('code changed')
+            return RESTART
+        data = snapshot(self.data)
+        if data != self._data:
+            self.args.log.info('data changed')
+            self._data = data
+            try:
+                self.warm()
+            except Exception as e:  # The data may be broken, which the next build will report.
+                self.args.log.warning('warming up failed: {0}'.format(e))
+
+    def handle(self, conn):
+        """
+        Answer one request.
+
+        :return: `False` if the daemon should stop, else `True`.
+        """
+        with conn, conn.makefile('rwb') as fp:
+            try:
+                req = json.loads(fp.readline().decode('utf8'))
+            except ValueError:
+                req = {}
+            command = req.get('command')
+            if command == 'build':
+                res = self.build(req.get('options'))
+            elif command in ['ping', 'stop']:
+                res = {'ok': True}
+            else:
+                res = {'ok': False, 'diagnostics': ['ERROR: invalid request']}
+            fp.write(json.dumps(res).encode('utf8') + b'\n')
+            fp.flush()
+        return command != 'stop'
+
+    def serve(self):
+        """
+        Serve requests until asked to stop - or until the code changes.
+
+        :return: `RESTART` if the code changed, else `None`.
+        """
+        if self.socket_path.exists():
+            try:
+                request(self.socket_path, 'ping')
+            except (ConnectionError, OSError):
+                # A stale socket file of a daemon which didn't shut down cleanly:
+                self.socket_path.unlink()
+            else:
+                raise ValueError('A daemon is already listening on {0}'.format(self.socket_path))
+        self.warm()
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            server.bind(str(self.socket_path))
+            server.listen()
+            server.settimeout(self.poll)
+            self.args.log.info('listening on {0}'.format(self.socket_path))
+            while True:
+                try:
+                    conn, _ = server.accept()
+                except socket.timeout:
+                    if self.changes() == RESTART:
+                        return RESTART
+                    continue
+                conn.settimeout(None)
+                if not self.handle(conn):
+                    return
+                if self.changes() == RESTART:
+                    return RESTART
+        finally:
+            server.close()
+            if self.socket_path.exists():
+                self.socket_path.unlink()
+
+
+def request(socket_path, command, **options):
+    """
+    Send a request to the daemon listening on `socket_path`.
+
+    :return: `dict` of the response.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+        conn.connect(str(socket_path))
+        with conn.makefile('rwb') as fp:
+            fp.write(json.dumps({'command': command, 'options': options}).encode('utf8') + b'\n')
+            fp.flush()
+            return json.loads(fp.readline().decode('utf8'))
@@ -0,0 +1,202 @@
+"""
+A SQLite database of the CLDF data, indexed for the typical lookups:
+
+- values of a language for a parameter - `(Language_ID, Parameter_ID)`,
+- languages with a given code for a parameter - `(Parameter_ID, Code_ID)`,
+- languages with a given phoneme in their consonant or vowel inventory - `(Phoneme)`.
+
+All indexes are covering, i.e. these lookups don't need to read table rows.
+"""
+import queue
+import sqlite3
+import pathlib
+import contextlib
+
+from .util import normalize_phoneme
+from .phonemes import PHONEME_PARAMS
+
+__all__ = ['DatabaseBuilder', 'Database']
+
+SCHEMA = """\
+CREATE TABLE language (
+    ID TEXT PRIMARY KEY,
+    Name TEXT,
+    Glottocode TEXT,
+    Latitude REAL,
+    Longitude REAL,
+    Macroarea TEXT,
+    Source TEXT
+);
+CREATE TABLE parameter (
+    ID TEXT PRIMARY KEY,
+    Name TEXT,
+    Section TEXT,
+    datatype TEXT,
+    multichoice INTEGER
+);
+CREATE TABLE code (
+    ID TEXT PRIMARY KEY,
+    Name TEXT,
+    Parameter_ID TEXT
+);
+CREATE TABLE value (
+    ID TEXT PRIMARY KEY,
+    Language_ID TEXT,
+    Parameter_ID TEXT,
+    Value TEXT,
+    Code_ID TEXT,
+    Comment TEXT,
+    Source TEXT
+);
+CREATE TABLE phoneme (
+    Phoneme TEXT,
+    Language_ID TEXT,
+    Parameter_ID TEXT,
+    PRIMARY KEY (Phoneme, Language_ID, Parameter_ID)
+) WITHOUT ROWID;
+"""
+INDEXES = """\
+CREATE INDEX value_language_parameter ON value (Language_ID, Parameter_ID, Value, Code_ID);
+CREATE INDEX value_parameter_code ON value (Parameter_ID, Code_ID, Language_ID);
+ANALYZE;
+"""
+COLUMNS = {
+    'language': ['ID', 'Name', 'Glottocode', 'Latitude', 'Longitude', 'Macroarea', 'Source'],
+    'parameter': ['ID', 'Name', 'Section', 'datatype', 'multichoice'],
+    'code': ['ID', 'Name', 'Parameter_ID'],
+    'value': ['ID', 'Language_ID', 'Parameter_ID', 'Value', 'Code_ID', 'Comment', 'Source'],
+    'phoneme': ['Phoneme', 'Language_ID', 'Parameter_ID'],
+}
+
+
+class DatabaseBuilder(object):
+    """
+    Writes rows - as passed to the CLDF writer - to a new SQLite database.
+
+    The database is built in a temporary file, which replaces the file at `path` upon `close`.
+    """
+    batch_size = 1000
+
+    def __init__(self, path):
+        self.path = path
+        self._tmp = path.parent / '{0}.tmp'.format(path.name)
+        if self._tmp.exists():
+            self._tmp.unlink()
+        self._conn = sqlite3.connect(str(self._tmp))
+        self._conn.executescript(SCHEMA)
+        self._batches = {table: [] for table in COLUMNS}
+
+    def _flush(self, table):
+        if self._batches[table]:
+            self._conn.executemany(
+                'INSERT OR IGNORE INTO {0} ({1}) VALUES ({2})'.format(
+                    table,
+                    ', '.join(COLUMNS[table]),
+                    ', '.join('?' for _ in COLUMNS[table])),
+                self._batches[table])
+            self._batches[table] = []
+
+    def add(self, table, row):
+        def col(v):
+            if isinstance(v, (list, tuple)):
+                return ';'.join(v)
+            if isinstance(v, bool):
+                return int(v)
+            return v
+
+        self._batches[table].append(tuple(col(row.get(c)) for c in COLUMNS[table]))
+        if table == 'value' and row['Parameter_ID'] in PHONEME_PARAMS:
+            self.add('phoneme', {
+                'Phoneme': normalize_phoneme(row['Value']),
+                'Language_ID': row['Language_ID'],
+                'Parameter_ID': row['Parameter_ID'],
+            })
+        if len(self._batches[table]) >= self.batch_size:
+            self._flush(table)
+
+    def close(self):
+        for table in self._batches:
+            self._flush(table)
+        # Creating the indexes after inserting the data is faster than updating them for each row:
+        self._conn.executescript(INDEXES)
+        self._conn.commit()
+        self._conn.close()
+        self._tmp.replace(self.path)
+
+
+class Database(object):
+    """
+    Read-only access to a database written by `DatabaseBuilder`, which can be shared by threads.
+
+    Each thread checks out a connection from a pool. Since queries use fixed SQL with `?`
+    placeholders, they are compiled only once per connection and re-used from `sqlite3` 's
+    statement cache.
+    """
+    def __init__(self, path, pool_size=4):
+        self.path = pathlib.Path(path)
+        if not self.path.exists():
+            raise ValueError('No database at {0}'.format(self.path))
+        self._pool = queue.LifoQueue()
+        for _ in range(pool_size):
+            self._pool.put(sqlite3.connect(
+                '{0}?mode=ro'.format(self.path.resolve().as_uri()),
+                uri=True,
+                check_same_thread=False))
+
+    def close(self):
+        while not self._pool.empty():
+            self._pool.get().close()
+
+    @contextlib.contextmanager
+    def connection(self):
+        conn = self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    def query(self, sql, *params):
+        with self.connection() as conn:
+            return conn.execute(sql, params).fetchall()
+
+    def values(self, language, parameter):
+        """
+        :return: `list` of pairs (Value, Code_ID) of `language` for `parameter`.
+        """
+        return self.query(
+            'SELECT Value, Code_ID FROM value WHERE Language_ID = ? AND Parameter_ID = ?',
+            language, parameter)
+
+    def languages_with_code(self, parameter, code):
+        """
+        :param code: Code_ID or name of a code of `parameter`.
+        """
+        if not code.startswith(parameter + '-'):
+            res = self.query(
+                'SELECT ID FROM code WHERE Parameter_ID = ? AND Name = ?', parameter, code)
+            if res:
+                code = res[0][0]
+        return {r[0] for r in self.query(
+            'SELECT DISTINCT Language_ID FROM value WHERE Parameter_ID = ? AND Code_ID = ?',
+            parameter, code)}
+
+    def languages_with_phoneme(self, phoneme):
+        return {r[0] for r in self.query(
+            'SELECT DISTINCT Language_ID FROM phoneme WHERE Phoneme = ?',
+            normalize_phoneme(phoneme))}
+
+    def languages(self, phonemes=(), **codes):
+        """
+        Languages matching all conditions, e.g.
+
+            db.languages(phonemes=['ʔ'], Complexity_category='Highly Complex')
+
+        :return: `set` of Language_IDs.
+        """
+        res = None
+        for cond in [self.languages_with_phoneme(p) for p in phonemes] + \
+                [self.languages_with_code(pid, code) for pid, code in sorted(codes.items())]:
+            res = cond if res is None else res & cond
+        if res is None:
+            return {r[0] for r in self.query('SELECT ID FROM language')}
+        return res
@@ -0,0 +1,182 @@
+"""
+A structural diff between two builds of the CLDF data.
+
+Since value IDs are just running numbers, rows of the ValueTable are compared by key: For
+multichoice parameters by (Language_ID, Parameter_ID, Code_ID) - or (Language_ID, Parameter_ID,
+Value) for values without code -, for parameters with one value per language by (Language_ID,
+Parameter_ID), so edited values show up as changed. The rows of each language are fingerprinted
+when reading the tables - with an order-independent sum of row hashes - so languages with
+identical values in both builds are skipped without comparing their rows.
+
+Codes, parameters, languages and sources are compared by ID - or citation key.
+"""
+import csv
+import collections
+
+from .check import _tables, BIB_KEY_PATTERN
+
+__all__ = ['diff', 'format_diff']
+
+# Row hashes are summed modulo 2**64:
+MASK = (1 << 64) - 1
+
+
+def _table(path, key='ID'):
+    """
+    :return: `OrderedDict` mapping IDs to rows as `tuple` s - with the ID column removed.
+    """
+    with path.open(encoding='utf8', newline='') as fp:
+        reader = csv.reader(fp)
+        header = next(reader)
+        i = header.index(key)
+        return collections.OrderedDict((row[i], tuple(row[:i] + row[i + 1:])) for row in reader)
+
+
+def _multichoice(path):
+    """
+    :return: `set` of the IDs of multichoice parameters.
+    """
+    with path.open(encoding='utf8', newline='') as fp:
+        return {row['ID'] for row in csv.DictReader(fp) if row.get('multichoice') == 'yes'}
+
+
+def _values(path, multichoice):
+    """
+    :param multichoice: `set` of the IDs of multichoice parameters.
+    :return: `tuple` (fingerprints, rows) of `dict` s mapping Language_IDs to the fingerprint and \
+    the `list` of triples (key, value, data) of the language's values - with `key` being a pair \
+    (Parameter_ID, value) for multichoice parameters and (Parameter_ID, None) otherwise.
+    """
+    fingerprints, rows = collections.Counter(), collections.defaultdict(list)
+    with path.open(encoding='utf8', newline='') as fp:
+        reader = csv.reader(fp)
+        header = next(reader)
+        lid, pid, value = [header.index(c) for c in ['Language_ID', 'Parameter_ID', 'Value']]
+        cid = header.index('Code_ID') if 'Code_ID' in header else None
+        data = [i for i, c in enumerate(header) if c not in {'ID', 'Language_ID', 'Parameter_ID'}]
+        for row in reader:
+            v = row[cid] if cid is not None and row[cid] else row[value]
+            key = (row[pid], v if row[pid] in multichoice else None)
+            d = tuple(row[i] for i in data)
+            fingerprints[row[lid]] = (fingerprints[row[lid]] + hash((key, d))) & MASK
+            rows[row[lid]].append((key, v, d))
+    return fingerprints, rows
+
+
+def _sources(path):
+    """
+    :return: `dict` mapping citation keys to the BibTeX of the entry.
+    """
+    res, key = {}, None
+    if path.is_file():
+        with path.open(encoding='utf8') as fp:
+            for line in fp:
+                m = BIB_KEY_PATTERN.match(line)
+                if m:
+                    key = m.group('key')
+                    res[key] = []
+                if key:
+                    res[key].append(line.rstrip())
+    return {k: '\n'.join(lines).strip() for k, lines in res.items()}
+
+
+def _compare(old, new):
+    """
+    :param old: `dict` mapping keys to data.
+    :param new: `dict` mapping keys to data.
+    :return: `OrderedDict` with keys "added", "removed" and "changed", mapping to sorted `list` s \
+    of keys.
+    """
+    return collections.OrderedDict([
+        ('added', sorted(k for k in new if k not in old)),
+        ('removed', sorted(k for k in old if k not in new)),
+        ('changed', sorted(k for k in new if k in old and old[k] != new[k])),
+    ])
+
+
+def _compare_values(old, new):
+    """
+    :param old: `list` of (key, value, data) triples of the values of one language in the old \
+    build.
+    :param new: `list` of (key, value, data) triples of the values of one language in the new \
+    build.
+    :return: `OrderedDict` mapping Parameter_IDs to `OrderedDict` s with keys "added", "removed" \
+    and "changed", mapping to `list` s of values - with changed values of parameters with one \
+    value per language given as "<old> -> <new>".
+    """
+    def grouped(rows):
+        res = collections.defaultdict(list)
+        for key, value, data in rows:
+            res[key].append((data, value))
+        return {k: sorted(v) for k, v in res.items()}
+
+    def label(rows):
+        return '; '.join(value for _, value in rows)
+
+    res, old, new = collections.OrderedDict(), grouped(old), grouped(new)
+    for key in sorted(set(old) | set(new)):
+        if old.get(key) == new.get(key):
+            continue
+        pid, value = key
+        d = res.setdefault(
+            pid, collections.OrderedDict([('added', []), ('removed', []), ('changed', [])]))
+        if key not in old:
+            d['added'].append(value or label(new[key]))
+        elif key not in new:
+            d['removed'].append(value or label(old[key]))
+        elif value or label(old[key]) == label(new[key]):
+            d['changed'].append(value or label(new[key]))
+        else:
+            d['changed'].append('{0} -> {1}'.format(label(old[key]), label(new[key])))
+    return res
+
+
+def diff(old, new):
+    """
+    :param old: Directory of the old CLDF data.
+    :param new: Directory of the new CLDF data.
+    :return: `OrderedDict` mapping "languages", "parameters", "codes" and "sources" to the result \
+    of comparing the tables by ID (see `_compare`), and "values" to an `OrderedDict` mapping \
+    Language_IDs to the changes per parameter (see `_compare_values`).
+    """
+    (old_tables, old_bib), (new_tables, new_bib) = _tables(old), _tables(new)
+    res = collections.OrderedDict()
+    for name, table in [
+        ('languages', 'LanguageTable'),
+        ('parameters', 'ParameterTable'),
+        ('codes', 'CodeTable'),
+    ]:
+        res[name] = _compare(_table(old_tables[table]), _table(new_tables[table]))
+    res['sources'] = _compare(_sources(old_bib), _sources(new_bib))
+
+    multichoice = \
+        _multichoice(old_tables['ParameterTable']) | _multichoice(new_tables['ParameterTable'])
+    (old_fps, old_rows), (new_fps, new_rows) = \
+        _values(old_tables['ValueTable'], multichoice), \
+        _values(new_tables['ValueTable'], multichoice)
+    res['values'] = collections.OrderedDict()
+    for lid in sorted(set(old_rows) | set(new_rows)):
+        if lid in old_fps and lid in new_fps and old_fps[lid] == new_fps[lid]:
+            continue
+        changes = _compare_values(old_rows.get(lid, []), new_rows.get(lid, []))
+        if changes:
+            res['values'][lid] = changes
+    return res
+
+
+def format_diff(d):
+    """
+    :param d: Result of `diff`.
+    :return: `list` of lines describing the differences.
+    """
+    lines = []
+    for name in ['languages', 'parameters', 'codes', 'sources']:
+        for op, sign in [('added', '+'), ('removed', '-'), ('changed', '~')]:
+            for id_ in d[name][op]:
+                lines.append('{0} {1} {2}'.format(sign, name, id_))
+    for lid, params in d['values'].items():
+        for pid, changes in params.items():
+            for op, sign in [('added', '+'), ('removed', '-'), ('changed', '~')]:
+                for value in changes[op]:
+                    lines.append('{0} values {1} {2}: {3}'.format(sign, lid, pid, value))
+    return lines
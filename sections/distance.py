@@ -0,0 +1,222 @@
+"""
+Gower distances between languages, computed - vectorized with `numpy` - from the language x
+parameter matrix written by `MatrixBuilder`.
+
+The distance of two languages is the weighted mean of the distances per parameter, over the
+parameters for which both languages have a value:
+
+- categorical parameters: 0 for the same code, 1 otherwise,
+- multichoice parameters: the Jaccard distance of the code sets,
+- numeric parameters: the absolute difference, divided by the range of the parameter's values.
+
+Distances are computed in blocks of rows, so memory use stays bounded for tens of thousands of
+languages. Per block, we sum up the weights of the parameters with values for both languages -
+and the weighted similarities, i.e. 1 - distance: Both sums over categorical parameters are
+matrix products of (one-hot) encodings, multichoice and numeric parameters are processed column
+by column. Distances of languages without any parameter in common are `NaN`.
+
+Full distance matrices and k-nearest-neighbor tables can be cached in a directory, keyed by the
+hash of the matrix - i.e. of the build - and the parameter weights.
+"""
+import json
+import hashlib
+import collections
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+__all__ = ['Gower']
+
+# Maximal number of elements of the (block x languages) arrays we compute at once:
+BLOCK_ELEMENTS = 2 ** 22
+
+
+class Gower(object):
+    def __init__(self, matrix, weights=None, sections=None, cache_dir=None):
+        """
+        :param matrix: A `Matrix` instance.
+        :param weights: `dict` mapping Parameter_IDs to weights - defaulting to 1. Parameters with \
+        weight 0 are ignored.
+        :param sections: Iterable of section names - as in the Section column of the \
+        ParameterTable - to restrict the parameters to.
+        :param cache_dir: Directory to cache distance matrices and nearest-neighbor tables in.
+        """
+        if np is None:  # pragma: no cover
+            raise ValueError('Computing distances requires numpy')
+        self.matrix = matrix
+        self.languages = matrix.languages
+        self.cache_dir = cache_dir
+        weights = weights or {}
+        sections = set(sections) if sections else None
+        self.weights = collections.OrderedDict()
+        for pid in matrix.parameters:
+            if sections is None or matrix.sections.get(pid) in sections:
+                if weights.get(pid, 1):
+                    self.weights[pid] = float(weights.get(pid, 1))
+        self._prepare()
+
+    @property
+    def key(self):
+        """
+        Cache key, identifying the matrix and the parameter weights.
+        """
+        return hashlib.md5(
+            json.dumps([self.matrix.hash, list(self.weights.items())]).encode('utf8')
+        ).hexdigest()
+
+    def _prepare(self):
+        n = len(self.languages)
+        # Lists of (weight, one-hot encoding of codes as floats) and (weight, presence of values):
+        onehot, present = [], []
+        # Lists of (weight, bool matrix of codes as floats, code set sizes):
+        self._multichoice = []
+        # Lists of (weight, values with 0 for missing, presence as floats, range):
+        self._numeric = []
+        for pid, w in self.weights.items():
+            col = np.asarray(self.matrix[pid])
+            kind = self.matrix.column_type(pid)
+            if kind == 'categorical':
+                codes = np.zeros((n, len(self.matrix.codes[pid])), dtype='float32')
+                rows = np.flatnonzero(col >= 0)
+                codes[rows, col[rows]] = 1
+                onehot.append((w, codes))
+                present.append((w, col >= 0))
+            elif kind == 'multichoice':
+                codes = col.astype('float32')
+                sizes = codes.sum(axis=1)
+                self._multichoice.append((w, codes, sizes))
+                present.append((w, sizes > 0))
+            else:
+                mask = ~np.isnan(col)
+                values = np.where(mask, col, 0.0).astype('float32')
+                span = (values[mask].max() - values[mask].min()) if mask.any() else 0.0
+                self._numeric.append((w, values, mask.astype('float32'), span or 1.0))
+                present.append((w, mask))
+        # The presence of values per parameter - and scaled by the parameter weights - so that
+        # a matrix product sums up the weights of the parameters with values for both languages:
+        self._present = np.array([p for _, p in present], dtype='float32').T.reshape((n, -1))
+        self._weighted_present = \
+            self._present * np.array([w for w, _ in present], dtype='float32')
+        # The one-hot encodings of categorical parameters - and scaled by the parameter weights -
+        # so that a matrix product sums up the weights of the parameters with matching codes:
+        self._onehot = np.hstack([a for _, a in onehot]) if onehot \
+            else np.zeros((n, 0), dtype='float32')
+        self._weighted_onehot = self._onehot * np.repeat(
+            [w for w, _ in onehot], [a.shape[1] for _, a in onehot]).astype('float32')
+
+    def block(self, start, stop):
+        """
+        :return: `float32` array of the distances of languages `start` to `stop - 1` to all \
+        languages.
+        """
+        rows = slice(start, stop)
+        # Summed weights of the parameters with values for both languages:
+        weight = self._weighted_present[rows].dot(self._present.T)
+        # Summed weighted similarities, i.e. 1 - distance, per parameter:
+        sim = self._weighted_onehot[rows].dot(self._onehot.T)
+        for w, codes, sizes in self._multichoice:
+            # Jaccard similarity, which is 0 if only one of the languages has codes:
+            inter = codes[rows].dot(codes.T)
+            union = np.add.outer(sizes[rows], sizes)
+            union -= inter
+            np.divide(inter, union, out=inter, where=union > 0)
+            inter *= w
+            sim += inter
+        for w, values, mask, span in self._numeric:
+            d = np.subtract.outer(values[rows], values)
+            np.abs(d, out=d)
+            d *= -w / span
+            d += w
+            d *= np.outer(mask[rows], mask)
+            sim += d
+        sim -= weight
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(weight > 0, -sim / weight, np.float32('nan'))
+
+    def iter_blocks(self):
+        """
+        Generate triples (start, stop, block) covering all languages.
+        """
+        n = len(self.languages)
+        size = max(1, BLOCK_ELEMENTS // max(n, 1))
+        for start in range(0, n, size):
+            stop = min(n, start + size)
+            yield start, stop, self.block(start, stop)
+
+    def _cached(self, name):
+        if self.cache_dir:
+            if not self.cache_dir.exists():
+                self.cache_dir.mkdir(parents=True)
+            return self.cache_dir / '{0}-{1}'.format(self.key, name)
+
+    def distances(self):
+        """
+        :return: The full, symmetric `float32` matrix of distances between all languages - \
+        memory-mapped from the cache if a cache directory is used.
+        """
+        path = self._cached('distances.npy')
+        if path and path.exists():
+            return np.load(str(path), mmap_mode='r')
+        n = len(self.languages)
+        if path:
+            tmp = path.parent / '.{0}.tmp'.format(path.name)
+            res = np.lib.format.open_memmap(str(tmp), mode='w+', dtype='float32', shape=(n, n))
+        else:
+            res = np.empty((n, n), dtype='float32')
+        for start, stop, block in self.iter_blocks():
+            res[start:stop] = block
+        if path:
+            res.flush()
+            del res
+            tmp.replace(path)
+            return np.load(str(path), mmap_mode='r')
+        return res
+
+    def knn(self, k=5):
+        """
+        The `k` nearest neighbors of all languages - excluding the language itself and languages
+        without any parameter in common.
+
+        :return: `tuple` (indices, distances) of `(languages x k)` arrays, sorted by distance. \
+        Rows of languages with fewer than `k` neighbors are padded with -1 and `inf`.
+        """
+        path = self._cached('knn{0}.npz'.format(k))
+        if path and path.exists():
+            with np.load(str(path)) as res:
+                return res['indices'], res['distances']
+        n = len(self.languages)
+        k = min(k, max(n - 1, 0))
+        indices = np.full((n, k), -1, dtype='int64')
+        distances = np.full((n, k), np.inf)
+        if k < 1:
+            return indices, distances
+        for start, stop, block in self.iter_blocks():
+            block[np.arange(stop - start), np.arange(start, stop)] = np.inf
+            block[np.isnan(block)] = np.inf
+            top = np.argpartition(block, k - 1, axis=1)[:, :k]
+            d = np.take_along_axis(block, top, axis=1)
+            order = np.argsort(d, axis=1, kind='stable')
+            top, d = np.take_along_axis(top, order, axis=1), np.take_along_axis(d, order, axis=1)
+            indices[start:stop] = np.where(np.isinf(d), -1, top)
+            distances[start:stop] = d
+        if path:
+            np.savez(str(path), indices=indices, distances=distances)
+        return indices, distances
+
+    def nearest(self, lid, k=5):
+        """
+        :return: `list` of the (up to) `k` pairs (Language_ID, distance) of the languages nearest \
+        to `lid`.
+        """
+        i = self.matrix.language_index[lid]
+        d = self.block(i, i + 1)[0]
+        d[i] = np.nan
+        candidates = np.flatnonzero(~np.isnan(d))
+        k = min(k, len(candidates))
+        if k < 1:
+            return []
+        top = candidates[np.argpartition(d[candidates], k - 1)[:k]]
+        top = top[np.argsort(d[top], kind='stable')]
+        return [(self.languages[j], float(d[j])) for j in top]
@@ -0,0 +1,143 @@
+"""
+Conditional download of the raw data.
+
+A manifest in the raw data directory records URL, ETag and MD5 hash of the upstream content of
+each downloaded file. A file is only re-written if the server doesn't answer a conditional request
+with "304 Not Modified" and the content hash changed.
+
+Files are fetched concurrently, streaming the content in chunks to a temporary file, and written
+atomically, i.e. the temporary file - or the post-processed content, written to another temporary
+file - then replaces the target. The base URL may be a HTTP(S) or file URL or a local directory,
+e.g. a local mirror of the upstream repository for air-gapped builds.
+"""
+import re
+import os
+import json
+import pathlib
+import hashlib
+import urllib.error
+import urllib.request
+import concurrent.futures
+
+__all__ = ['Manifest', 'resolve_url', 'fetch', 'write_atomic', 'download']
+
+MANIFEST = 'manifest.json'
+
+
+def resolve_url(base, path):
+    if re.match('[a-z]+://', base):
+        return '{0}/{1}'.format(base.rstrip('/'), path)
+    return pathlib.Path(base).resolve().joinpath(path).as_uri()
+
+
+def fetch(url, path, etag=None, timeout=30, chunksize=2 ** 16):
+    """
+    Stream the content of `url` - in chunks of `chunksize` bytes - into the file at `path`.
+
+    :return: `tuple` (md5, etag), with `md5` being the hex digest of the content - or `None` if \
+    the server reported the resource as not modified since the version with `etag`, in which case \
+    nothing is written.
+    """
+    req = urllib.request.Request(url)
+    if etag:
+        req.add_header('If-None-Match', etag)
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as res:
+            md5 = hashlib.md5()
+            with path.open('wb') as fp:
+                for chunk in iter(lambda: res.read(chunksize), b''):
+                    md5.update(chunk)
+                    fp.write(chunk)
+            return md5.hexdigest(), res.headers.get('ETag')
+    except urllib.error.HTTPError as e:
+        if e.code == 304:
+            return None, etag
+        raise
+
+
+def write_atomic(path, chunks):
+    """
+    Write the `bytes` in `chunks` to a temporary file, which then replaces `path`.
+    """
+    tmp = path.parent / '.{0}.tmp'.format(path.name)
+    try:
+        with tmp.open('wb') as fp:
+            for chunk in chunks:
+                fp.write(chunk)
+        os.replace(str(tmp), str(path))
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+
+class Manifest(dict):
+    """
+    Maps names of downloaded files to `dict` s with keys "url", "etag" and "md5".
+    """
+    def __init__(self, path):
+        self.path = path
+        dict.__init__(self)
+        if path.exists():
+            with path.open(encoding='utf8') as fp:
+                self.update(json.load(fp))
+
+    def write(self):
+        write_atomic(
+            self.path,
+            [json.dumps(self, indent=4, sort_keys=True).encode('utf8'), b'\n'])
+
+
+def download(datadir, files, base_url, force=False, log=None):
+    """
+    :param files: `list` of triples (path, fname, postprocess), where `path` is the path of a \
+    file relative to `base_url`, `fname` the local file name and `postprocess` either `None` or \
+    a function accepting an iterator of lines (`bytes`) of the file and returning an iterable of \
+    `bytes` to write to the local file instead.
+    :param force: Flag signaling whether to disregard the manifest, re-writing all files.
+    :return: `list` of the names of changed files.
+    """
+    manifest = Manifest(datadir / MANIFEST)
+    before = dict(manifest)
+
+    def part(fname):
+        # The file the content is downloaded to, before it is post-processed:
+        return datadir / '.{0}.download'.format(fname)
+
+    def get(path, fname):
+        etag = None
+        if not force and (datadir / fname).exists():
+            etag = manifest.get(fname, {}).get('etag')
+        return fetch(resolve_url(base_url, path), part(fname), etag=etag)
+
+    changed = []
+    try:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(files)) as executor:
+            results = [executor.submit(get, path, fname) for path, fname, _ in files]
+
+        for (path, fname, postprocess), result in zip(files, results):
+            md5, etag = result.result()
+            if md5 is None:
+                if log:
+                    log.info('{0}: not modified'.format(fname))
+                continue
+            if not force and (datadir / fname).exists() \
+                    and manifest.get(fname, {}).get('md5') == md5:
+                if log:
+                    log.info('{0}: unchanged'.format(fname))
+            else:
+                if postprocess:
+                    with part(fname).open('rb') as fp:
+                        write_atomic(datadir / fname, postprocess(iter(fp)))
+                else:
+                    os.replace(str(part(fname)), str(datadir / fname))
+                changed.append(fname)
+                if log:
+                    log.info('{0}: updated'.format(fname))
+            manifest[fname] = {'url': resolve_url(base_url, path), 'etag': etag, 'md5': md5}
+    finally:
+        for _, fname, _ in files:
+            if part(fname).exists():
+                part(fname).unlink()
+    if manifest != before:
+        manifest.write()
+    return changed
@@ -0,0 +1,105 @@
+"""
+A persistent index of the few bits of Glottolog data we need, keyed by ISO 639-3 code.
+
+Reading all languoid INI files of a Glottolog clone just to look up ~100 ISO codes is by far
+the most expensive step of `makecldf`. So we do it once per Glottolog version and store
+`id`, `latitude`, `longitude` and `macroareas` of each languoid with an ISO code in a JSON
+file. Such a file can also be copied to `etc/` as snapshot, to build the CLDF data offline.
+"""
+import json
+
+import attr
+from clldutils.misc import slug
+
+__all__ = ['Languoid', 'LanguoidIndex']
+
+# Maps paths of index files to pairs ((mtime, size), index) of the indexes loaded so far:
+_LOADED = {}
+
+
+@attr.s
+class Languoid(object):
+    id = attr.ib()
+    latitude = attr.ib(default=None)
+    longitude = attr.ib(default=None)
+    macroareas = attr.ib(default=attr.Factory(list))
+
+    @classmethod
+    def from_glottolog(cls, lang):
+        return cls(
+            id=lang.id,
+            latitude=lang.latitude,
+            longitude=lang.longitude,
+            macroareas=[ma.name for ma in lang.macroareas])
+
+
+class LanguoidIndex(object):
+    """
+    A mapping of ISO 639-3 codes to `Languoid` instances, which is read from disk lazily, i.e.
+    upon first lookup.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.version = None
+        self._languoids = None
+
+    @classmethod
+    def load(cls, path):
+        """
+        Get the index stored at `path`, re-using the index loaded before - e.g. in a long-running
+        build process - as long as the file doesn't change.
+        """
+        stat = path.stat()
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        key = str(path.resolve())
+        if key not in _LOADED or _LOADED[key][0] != stamp:
+            _LOADED[key] = (stamp, cls(path))
+        return _LOADED[key][1]
+
+    @classmethod
+    def from_catalog(cls, catalog, cache_dir):
+        """
+        Get the index for the Glottolog version checked out in `catalog`, building it if necessary.
+        """
+        version = catalog.describe()
+        path = cache_dir / 'glottolog-{0}.json'.format(slug(version))
+        if not path.exists():
+            index = cls(path)
+            index.version = version
+            index._languoids = {
+                lang.iso: Languoid.from_glottolog(lang)
+                for lang in catalog.api.languoids() if lang.iso}
+            index.write()
+        return cls.load(path)
+
+    def write(self, path=None):
+        path = path or self.path
+        if not path.parent.exists():
+            path.parent.mkdir(parents=True)
+        self._load()
+        with path.open('w', encoding='utf8') as fp:
+            json.dump(
+                {
+                    'version': self.version,
+                    'languoids': {
+                        iso: attr.astuple(lang) for iso, lang in sorted(self._languoids.items())},
+                },
+                fp,
+                ensure_ascii=False)
+
+    def _load(self):
+        if self._languoids is None:
+            with self.path.open(encoding='utf8') as fp:
+                d = json.load(fp)
+            self.version = d['version']
+            self._languoids = {iso: Languoid(*v) for iso, v in d['languoids'].items()}
+        return self._languoids
+
+    def __contains__(self, iso):
+        return iso in self._load()
+
+    def __getitem__(self, iso):
+        return self._load()[iso]
+
+    def __len__(self):
+        return len(self._load())
@@ -0,0 +1,194 @@
+"""
+A compact binary language x parameter matrix, derived from the ValueTable rows of a build.
+
+The matrix is stored in a directory, as a set of `.npy` files - which can be memory-mapped when
+loading, thus no data is copied or parsed - and a JSON index of rows and columns:
+
+- `categorical.npy`: `int16` array with one column per categorical parameter, holding the index
+  of the code in the column's code list or -1 for missing values.
+- `multichoice.npy`: `bool` array with one bitmask column per code of a multichoice parameter.
+- `numeric.npy`: `float64` array with one column per integer or number parameter, holding `NaN`
+  for missing values.
+- `index.json`: Language IDs (the rows), the column specs of the three arrays, the sections of
+  the parameters and a hash of the matrix content - identifying the build.
+
+Reading the matrix requires `numpy`.
+"""
+import json
+import hashlib
+import collections
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+__all__ = ['MatrixBuilder', 'Matrix']
+
+ARRAYS = collections.OrderedDict([
+    ('categorical', 'int16'),
+    ('multichoice', 'bool'),
+    ('numeric', 'float64'),
+])
+
+
+class MatrixBuilder(object):
+    """
+    Collects ValueTable rows - as passed to the CLDF writer - and writes them as matrix.
+    """
+    def __init__(self, schema):
+        """
+        :param schema: `OrderedDict` of lists of `Parameter` s, as returned by `compile_schema`.
+        """
+        self.languages = collections.OrderedDict()
+        self.categorical = collections.OrderedDict()
+        self.multichoice = collections.OrderedDict()
+        self.numeric = collections.OrderedDict()
+        self.sections = collections.OrderedDict()
+        for params in schema.values():
+            for param in params:
+                self.sections[param.id] = param.as_row()['Section']
+                if param.multichoice:
+                    self.multichoice[param.id] = set()
+                elif param.codes:
+                    self.categorical[param.id] = list(param.codes.values())
+                elif param.datatype in ['integer', 'number']:
+                    self.numeric[param.id] = param.datatype
+
+    def add(self, row):
+        pid = row['Parameter_ID']
+        values = self.languages.setdefault(row['Language_ID'], {})
+        if pid in self.multichoice:
+            self.multichoice[pid].add(row['Code_ID'])
+            values.setdefault(pid, set()).add(row['Code_ID'])
+        elif pid in self.categorical:
+            if row['Code_ID'] not in self.categorical[pid]:
+                self.categorical[pid].append(row['Code_ID'])
+            values[pid] = row['Code_ID']
+        elif pid in self.numeric:
+            values[pid] = row['Value']
+
+    def index(self):
+        return collections.OrderedDict([
+            ('languages', list(self.languages)),
+            ('categorical', [[pid, codes] for pid, codes in self.categorical.items()]),
+            ('multichoice', [
+                [pid, cid] for pid, cids in self.multichoice.items() for cid in sorted(cids)]),
+            ('numeric', [[pid, dt] for pid, dt in self.numeric.items()]),
+            ('sections', self.sections),
+        ])
+
+    def arrays(self):
+        index = self.index()
+        n = len(self.languages)
+        cat = np.full((n, len(index['categorical'])), -1, dtype=ARRAYS['categorical'])
+        mc = np.zeros((n, len(index['multichoice'])), dtype=ARRAYS['multichoice'])
+        num = np.full((n, len(index['numeric'])), np.nan, dtype=ARRAYS['numeric'])
+        mc_cols = {(pid, cid): j for j, (pid, cid) in enumerate(index['multichoice'])}
+
+        for i, values in enumerate(self.languages.values()):
+            for j, (pid, codes) in enumerate(index['categorical']):
+                if pid in values:
+                    cat[i, j] = codes.index(values[pid])
+            for pid in self.multichoice:
+                for cid in values.get(pid, []):
+                    mc[i, mc_cols[pid, cid]] = True
+            for j, (pid, _) in enumerate(index['numeric']):
+                if pid in values:
+                    num[i, j] = float(values[pid])
+        return index, collections.OrderedDict(
+            [('categorical', cat), ('multichoice', mc), ('numeric', num)])
+
+    def write(self, path):
+        if np is None:  # pragma: no cover
+            raise ValueError('Writing the matrix requires numpy')
+        if not path.exists():
+            path.mkdir(parents=True)
+        index, arrays = self.arrays()
+        md5 = hashlib.md5(json.dumps(index).encode('utf8'))
+        for name, a in arrays.items():
+            md5.update(a.tobytes())
+            np.save(str(path / '{0}.npy'.format(name)), a)
+        index['hash'] = md5.hexdigest()
+        with path.joinpath('index.json').open('w', encoding='utf8') as fp:
+            json.dump(index, fp, ensure_ascii=False)
+
+
+class Matrix(object):
+    """
+    A matrix written by `MatrixBuilder`, with the arrays memory-mapped read-only.
+
+        m = Matrix.load(pathlib.Path('matrix'))
+        m['Tone']  # integer codes of a categorical parameter, -1 for missing values
+        m.codes['Tone']  # the Code_IDs corresponding to these integer codes
+        m['Vowel_inventory']  # bool array, one column per Code_ID in m.codes['Vowel_inventory']
+        m.value('alc', 'N_consonants')
+    """
+    def __init__(self, index, arrays):
+        self.languages = index['languages']
+        self.language_index = {lid: i for i, lid in enumerate(self.languages)}
+        self.codes = collections.OrderedDict()
+        self.datatypes = collections.OrderedDict()
+        # Maps Parameter_IDs to the section they belong to:
+        self.sections = index.get('sections', {})
+        # A hash of the matrix content:
+        self.hash = index.get('hash')
+        self._columns = {}
+        self.arrays = arrays
+
+        for j, (pid, codes) in enumerate(index['categorical']):
+            self.codes[pid] = codes
+            self._columns[pid] = ('categorical', j)
+        for j, (pid, cid) in enumerate(index['multichoice']):
+            if pid not in self._columns:
+                self.codes[pid] = []
+                self._columns[pid] = ('multichoice', slice(j, j))
+            self.codes[pid].append(cid)
+            # Columns of one parameter are contiguous, so we only need to extend the slice:
+            self._columns[pid] = ('multichoice', slice(self._columns[pid][1].start, j + 1))
+        for j, (pid, dt) in enumerate(index['numeric']):
+            self.datatypes[pid] = dt
+            self._columns[pid] = ('numeric', j)
+
+    @classmethod
+    def load(cls, path, mmap_mode='r'):
+        if np is None:  # pragma: no cover
+            raise ValueError('Reading the matrix requires numpy')
+        with path.joinpath('index.json').open(encoding='utf8') as fp:
+            index = json.load(fp)
+        return cls(index, {
+            name: np.load(str(path / '{0}.npy'.format(name)), mmap_mode=mmap_mode)
+            for name in ARRAYS})
+
+    @property
+    def parameters(self):
+        return list(self._columns)
+
+    def __contains__(self, pid):
+        return pid in self._columns
+
+    def column_type(self, pid):
+        """
+        :return: "categorical", "multichoice" or "numeric".
+        """
+        return self._columns[pid][0]
+
+    def __getitem__(self, pid):
+        """
+        :return: A view on the column(s) for parameter `pid`.
+        """
+        name, col = self._columns[pid]
+        return self.arrays[name][:, col]
+
+    def value(self, lid, pid):
+        """
+        :return: The value of parameter `pid` for language `lid`, i.e. a Code_ID, a `list` of \
+        Code_IDs, a `float` or `None`.
+        """
+        name, _ = self._columns[pid]
+        v = self[pid][self.language_index[lid]]
+        if name == 'categorical':
+            return self.codes[pid][v] if v >= 0 else None
+        if name == 'multichoice':
+            return [cid for cid, b in zip(self.codes[pid], v) if b] or None
+        return None if np.isnan(v) else float(v)
@@ -0,0 +1,132 @@
+"""
+A language x phoneme bit matrix built from the consonant and vowel inventories, supporting
+vectorized containment queries and inventory similarity.
+
+The matrix is stored with one bit per phoneme, i.e. as `uint8` array packed along the phoneme
+axis, in `phonemes.npy` and a JSON index of languages and phonemes in `phonemes.json`.
+Requires `numpy`.
+"""
+import json
+import collections
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+from .util import normalize_phoneme
+
+__all__ = ['PhonemeIndex', 'PHONEME_PARAMS']
+
+PHONEME_PARAMS = ['Consonant_inventory', 'Vowel_inventory']
+
+
+class PhonemeIndex(object):
+    def __init__(self, languages, phonemes, bits):
+        """
+        :param languages: `list` of Language_IDs, labeling the rows of `bits`.
+        :param phonemes: `list` of phonemes, labeling the columns of `bits`.
+        :param bits: `bool` array of shape (len(languages), len(phonemes)).
+        """
+        self.languages = languages
+        self.phonemes = phonemes
+        self.bits = bits
+        self.language_index = {lid: i for i, lid in enumerate(languages)}
+        self.phoneme_index = {p: i for i, p in enumerate(phonemes)}
+        # Inventory sizes, and the bit matrix as floats for the matrix products in `jaccard`:
+        self.sizes = bits.sum(axis=1)
+        self._float = bits.astype('float32')
+
+    @classmethod
+    def from_inventories(cls, inventories):
+        """
+        :param inventories: `dict` mapping Language_IDs to iterables of phonemes.
+        """
+        phonemes = sorted({normalize_phoneme(p) for inv in inventories.values() for p in inv})
+        pindex = {p: i for i, p in enumerate(phonemes)}
+        bits = np.zeros((len(inventories), len(phonemes)), dtype=bool)
+        for i, inv in enumerate(inventories.values()):
+            bits[i, [pindex[normalize_phoneme(p)] for p in inv]] = True
+        return cls(list(inventories), phonemes, bits)
+
+    def write(self, path):
+        if not path.exists():
+            path.mkdir(parents=True)
+        np.save(str(path / 'phonemes.npy'), np.packbits(self.bits, axis=1))
+        with path.joinpath('phonemes.json').open('w', encoding='utf8') as fp:
+            json.dump(
+                collections.OrderedDict([
+                    ('languages', self.languages), ('phonemes', self.phonemes)]),
+                fp,
+                ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path):
+        if np is None:  # pragma: no cover
+            raise ValueError('Reading the phoneme index requires numpy')
+        with path.joinpath('phonemes.json').open(encoding='utf8') as fp:
+            index = json.load(fp)
+        packed = np.load(str(path / 'phonemes.npy'), mmap_mode='r')
+        bits = np.unpackbits(packed, axis=1)[:, :len(index['phonemes'])].astype(bool)
+        return cls(index['languages'], index['phonemes'], bits)
+
+    def mask(self, phonemes):
+        """
+        :return: `bool` vector, marking the columns of `phonemes`. Unknown phonemes are ignored.
+        """
+        res = np.zeros(len(self.phonemes), dtype=bool)
+        res[[self.phoneme_index[p] for p in map(normalize_phoneme, phonemes)
+             if p in self.phoneme_index]] = True
+        return res
+
+    def inventory(self, lid):
+        return {p for p, b in zip(self.phonemes, self.bits[self.language_index[lid]]) if b}
+
+    def _lids(self, selected):
+        return [self.languages[i] for i in np.flatnonzero(selected)]
+
+    def containing(self, phonemes):
+        """
+        :return: Languages with inventories which are a superset of `phonemes`.
+        """
+        phonemes = list(phonemes)
+        mask = self.mask(phonemes)
+        if mask.sum() < len(set(map(normalize_phoneme, phonemes))):
+            return []
+        return self._lids(self.bits[:, mask].all(axis=1))
+
+    def within(self, phonemes):
+        """
+        :return: Languages with inventories which are a subset of `phonemes`.
+        """
+        return self._lids(~self.bits[:, ~self.mask(phonemes)].any(axis=1))
+
+    def jaccard(self, lid=None):
+        """
+        Jaccard similarity of inventories, i.e. |A & B| / |A | B|.
+
+        :return: Vector of similarities of all languages with `lid` or - if no `lid` is given - \
+        the matrix of similarities between all pairs of languages.
+        """
+        if lid is None:
+            inter = self._float.dot(self._float.T)
+            union = self.sizes[:, None] + self.sizes[None, :] - inter
+        else:
+            i = self.language_index[lid]
+            inter = self._float.dot(self._float[i])
+            union = self.sizes + self.sizes[i] - inter
+        return np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+
+    def most_similar(self, lid, k=5):
+        """
+        :return: `list` of the `k` pairs (Language_ID, similarity) with highest Jaccard \
+        similarity to `lid` - excluding `lid` itself.
+        """
+        sims = self.jaccard(lid)
+        sims[self.language_index[lid]] = -1
+        k = min(k, len(self.languages) - 1)
+        if k < 1:
+            return []
+        top = np.argpartition(-sims, k - 1)[:k]
+        top = top[np.argsort(-sims[top], kind='stable')]
+        return [(self.languages[i], float(sims[i])) for i in top]
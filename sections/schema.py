@@ -0,0 +1,92 @@
+"""
+The parameter schema of the dataset, compiled once from the `parameters` declared by the classes
+in `PARAM_CLASSES`.
+"""
+import hashlib
+import functools
+import collections
+
+import attr
+from clldutils.misc import slug
+
+from .util import base16
+
+__all__ = ['Parameter', 'compile_schema', 'code_id', 'value_id', 'ValueIDs']
+
+
+@functools.lru_cache(maxsize=None)
+def code_id(param, code):
+    f = base16 if param.endswith('_inventory') else slug
+    return '{0}-{1}'.format(param, f(code))
+
+
+def value_id(lid, pid, value, cid=None):
+    """
+    :return: A ValueTable ID derived from the content of the value, i.e. from language and code - \
+    or language, parameter and a hash of the value for values without code.
+    """
+    if cid:
+        return '{0}-{1}'.format(lid, cid)
+    return '{0}-{1}-{2}'.format(
+        lid, pid, hashlib.md5(str(value).encode('utf8')).hexdigest()[:8])
+
+
+class ValueIDs(object):
+    """
+    Assigns stable, content-derived IDs to ValueTable rows. Rows with the same content - or a hash
+    collision - get IDs with a running number as suffix, in the order of the rows.
+    """
+    def __init__(self):
+        self.ids = set()
+
+    def __call__(self, v):
+        id_ = base = value_id(v['Language_ID'], v['Parameter_ID'], v['Value'], v.get('Code_ID'))
+        n = 1
+        while id_ in self.ids:
+            n += 1
+            id_ = '{0}-{1}'.format(base, n)
+        self.ids.add(id_)
+        return id_
+
+
+@attr.s
+class Parameter(object):
+    """
+    :ivar datatype: Either a CSVW datatype name, "multichoice" or a `list` of categorical options.
+    """
+    id = attr.ib()
+    section = attr.ib()
+    datatype = attr.ib()
+    getter = attr.ib()
+    refsgetter = attr.ib(default=None)
+    multichoice = attr.ib(default=False)
+    # Mapping of categorical options to Code_IDs:
+    codes = attr.ib(default=attr.Factory(collections.OrderedDict))
+
+    def __attrs_post_init__(self):
+        self.multichoice = self.datatype == 'multichoice'
+        if isinstance(self.datatype, (list, tuple)):
+            self.codes = collections.OrderedDict(
+                [(opt, code_id(self.id, opt)) for opt in self.datatype])
+
+    @property
+    def categorical(self):
+        return self.multichoice or bool(self.codes)
+
+    def as_row(self):
+        return {
+            'ID': self.id,
+            'Name': self.id.replace('_', ' '),
+            'Section': self.section.replace('_', ' '),
+            'datatype': 'categorical' if self.categorical else self.datatype,
+            'multichoice': self.multichoice,
+        }
+
+
+def compile_schema(param_classes):
+    """
+    :return: `OrderedDict` mapping section names to lists of `Parameter` instances.
+    """
+    return collections.OrderedDict(
+        (n, [Parameter(name, n, *spec) for name, *spec in cls().parameters])
+        for n, cls in param_classes.items())
@@ -0,0 +1,160 @@
+"""
+An inverted index over the free-text values, i.e. values of parameters with datatype "string"
+like process descriptions, notes and restrictions.
+
+The index has
+- token postings, mapping each (lowercased) word token to the documents - i.e. values - and
+  positions it occurs at, to answer phrase queries, and
+- character trigram postings, mapping each (lowercased) trigram to the documents it occurs in, to
+  answer substring queries.
+
+Candidates for a query are found by intersecting postings - starting with the shortest one - and
+only candidates are checked against the query.
+"""
+import re
+import json
+import bisect
+import collections
+
+__all__ = ['SearchIndex', 'tokenize']
+
+TOKEN_PATTERN = re.compile(r'\w+')
+
+
+def tokenize(s):
+    return TOKEN_PATTERN.findall(s.lower())
+
+
+def trigrams(s):
+    return {s[i:i + 3] for i in range(len(s) - 2)}
+
+
+def _find(docs, doc):
+    """
+    :return: Index of `doc` in the sorted `list` `docs` or `None`.
+    """
+    i = bisect.bisect_left(docs, doc)
+    return i if i < len(docs) and docs[i] == doc else None
+
+
+def _intersect(postings):
+    """
+    :param postings: `list` of sorted `list` s of document numbers.
+    :return: `list` of the document numbers in all `postings`.
+    """
+    if not postings:
+        return []
+    postings = sorted(postings, key=len)
+    res = postings[0]
+    for p in postings[1:]:
+        if len(res) * 16 < len(p):
+            # Looking up few candidates in a long list by bisection is cheap:
+            res = [d for d in res if _find(p, d) is not None]
+        else:
+            candidates = set(res)
+            res = [d for d in p if d in candidates]
+        if not res:
+            break
+    return res
+
+
+class SearchIndex(object):
+    def __init__(self):
+        # Documents as lists [ID, Language_ID, Parameter_ID, text]:
+        self.docs = []
+        # Token postings as pairs [docs, positions] of a sorted `list` of document numbers and a
+        # `list` of `list` s of positions in these documents:
+        self.tokens = collections.defaultdict(lambda: [[], []])
+        # Trigram postings as sorted `list` s of document numbers:
+        self.trigrams = collections.defaultdict(list)
+
+    def __len__(self):
+        return len(self.docs)
+
+    def add(self, vid, lid, pid, text):
+        doc = len(self.docs)
+        self.docs.append([vid, lid, pid, text])
+        positions = collections.OrderedDict()
+        for pos, token in enumerate(tokenize(text)):
+            positions.setdefault(token, []).append(pos)
+        for token, pos in positions.items():
+            self.tokens[token][0].append(doc)
+            self.tokens[token][1].append(pos)
+        for trigram in trigrams(text.lower()):
+            self.trigrams[trigram].append(doc)
+
+    def write(self, path):
+        with path.open('w', encoding='utf8') as fp:
+            json.dump(
+                {'docs': self.docs, 'tokens': self.tokens, 'trigrams': self.trigrams},
+                fp,
+                ensure_ascii=False,
+                separators=(',', ':'))
+
+    @classmethod
+    def load(cls, path):
+        index = cls()
+        with path.open(encoding='utf8') as fp:
+            d = json.load(fp)
+        index.docs = d['docs']
+        index.tokens.update(d['tokens'])
+        index.trigrams.update(d['trigrams'])
+        return index
+
+    def _hits(self, docs, language=None, parameter=None):
+        res = []
+        for doc in docs:
+            vid, lid, pid, text = self.docs[doc]
+            if (language is None or lid == language) and (parameter is None or pid == parameter):
+                res.append(collections.OrderedDict([
+                    ('ID', vid), ('Language_ID', lid), ('Parameter_ID', pid), ('Value', text)]))
+        return res
+
+    def phrase(self, query, language=None, parameter=None):
+        """
+        :return: `list` of values containing the sequence of word tokens in `query`.
+        """
+        tokens = tokenize(query)
+        if not tokens or any(t not in self.tokens for t in tokens):
+            return []
+
+        def positions(token, doc):
+            docs, positions = self.tokens[token]
+            return positions[_find(docs, doc)]
+
+        docs = []
+        for doc in _intersect([self.tokens[t][0] for t in set(tokens)]):
+            starts = set(positions(tokens[0], doc))
+            for i, token in enumerate(tokens[1:], start=1):
+                starts &= {pos - i for pos in positions(token, doc)}
+                if not starts:
+                    break
+            if starts:
+                docs.append(doc)
+        return self._hits(docs, language=language, parameter=parameter)
+
+    def substring(self, query, language=None, parameter=None):
+        """
+        :return: `list` of values containing `query` - compared case-insensitively.
+        """
+        query = query.lower()
+        if len(query) < 3:
+            # No trigrams to narrow down the candidates:
+            docs = range(len(self.docs))
+        else:
+            grams = trigrams(query)
+            if any(g not in self.trigrams for g in grams):
+                return []
+            docs = _intersect([self.trigrams[g] for g in grams])
+        return self._hits(
+            [doc for doc in docs if query in self.docs[doc][3].lower()],
+            language=language,
+            parameter=parameter)
+
+    def search(self, query, language=None, parameter=None):
+        """
+        Search for a phrase, if `query` is quoted, e.g. '"vowel reduction"', or a substring.
+        """
+        if len(query) > 1 and query.startswith('"') and query.endswith('"'):
+            return self.phrase(query[1:-1], language=language, parameter=parameter)
+        return self.substring(query, language=language, parameter=parameter)
@@ -0,0 +1,169 @@
+"""
+Segmentation of phoneme inventories into the known segments listed per parameter in
+`etc/phonemes.csv`.
+
+Each token of an inventory is matched - after Unicode normalization - against a trie of the
+known segments, preferring the longest match at each position. Tokens which can't be segmented
+completely raise a `ValueError`, so malformed symbols don't end up as new codes. Segments are
+returned in the spelling given in `etc/phonemes.csv`, thus different normalization forms of the
+same segment are mapped to the same code. Comments following the delimited inventory - like
+"and many more" - are ignored.
+
+The segmenters are loaded lazily - from `etc/phonemes.csv` of the dataset being built.
+"""
+import sys
+import csv
+import pathlib
+import unicodedata
+import collections
+
+__all__ = ['Segmenter', 'Segmenters', 'load_segmenters', 'SEGMENTERS']
+
+PHONEMES = pathlib.Path(__file__).parent.parent / 'etc' / 'phonemes.csv'
+# Inventories are given as "/p t k/" in the appendix, i.e. with slashes as delimiters:
+DELIMITER = '/'
+
+
+def normalize(s):
+    return unicodedata.normalize('NFC', s)
+
+
+class Trie(object):
+    """
+    A character trie, where nodes are `dict` s and the values of keys are stored under `None`.
+    """
+    def __init__(self):
+        self.root = {}
+
+    def add(self, key, value):
+        node = self.root
+        for c in key:
+            node = node.setdefault(c, {})
+        node[None] = value
+
+    def matches(self, s, start=0):
+        """
+        :return: `list` of pairs (end, value) for the keys matching `s` at `start`, longest first.
+        """
+        node, res = self.root, []
+        for i in range(start, len(s)):
+            node = node.get(s[i])
+            if node is None:
+                break
+            if None in node:
+                res.append((i + 1, node[None]))
+        return res[::-1]
+
+    def segment(self, s):
+        """
+        Split `s` into keys, preferring the longest match at each position - but backtracking if
+        the rest of `s` can't be split then.
+
+        :return: `list` of values of the matched keys or `None`, if `s` can't be split completely.
+        """
+        # A stack of (position, candidate matches at this position), and the matches taken so far:
+        stack, res, failed = [(0, self.matches(s))], [], set()
+        while stack:
+            pos, candidates = stack[-1]
+            if pos == len(s):
+                return res
+            if not candidates or pos in failed:
+                failed.add(pos)
+                stack.pop()
+                if res:
+                    res.pop()
+                continue
+            end, value = candidates.pop(0)
+            res.append(value)
+            stack.append((end, self.matches(s, end)))
+        return None
+
+
+class Segmenter(object):
+    def __init__(self, parameter, segments):
+        """
+        :param parameter: Parameter_ID of the inventory.
+        :param segments: Iterable of known segments - possibly with delimiters.
+        """
+        self.parameter = parameter
+        self._trie = Trie()
+        # The known segments, in the order given in `etc/phonemes.csv`:
+        self.segments = []
+        # Maps tokens - as found in the data - to tuples of segments:
+        self._tokens = {}
+        for segment in segments:
+            segment = sys.intern(segment)
+            self.segments.append(segment)
+            self._tokens[segment] = (segment,)
+            self._tokens.setdefault(normalize(segment), (segment,))
+            core = segment.strip(DELIMITER)
+            if core:
+                self._trie.add(normalize(core), sys.intern(core))
+
+    def segment_token(self, token):
+        if token not in self._tokens:
+            s = normalize(token)
+            core = s.strip(DELIMITER)
+            prefix, suffix = s[:len(s) - len(s.lstrip(DELIMITER))], s[len(s.rstrip(DELIMITER)):]
+            res = self._trie.segment(core) if core else None
+            if not res:
+                raise ValueError('{0}: invalid segment(s) "{1}"'.format(self.parameter, token))
+            # Re-attach delimiters to first and last segment:
+            res[0] = prefix + res[0]
+            res[-1] = res[-1] + suffix
+            self._tokens[token] = tuple(sys.intern(r) for r in res)
+        return self._tokens[token]
+
+    def __call__(self, s):
+        """
+        :return: `list` of segments of the whitespace separated inventory `s`.
+        """
+        if s.count(DELIMITER) > 1:
+            # Only the delimited inventory counts - not comments following it, like in
+            # "/ɴː/, many others in morphophonological contexts":
+            s = s[s.index(DELIMITER):s.rindex(DELIMITER) + 1]
+        return [
+            segment for token in s.split() if token.strip(DELIMITER)
+            for segment in self.segment_token(token)]
+
+
+def load_segmenters(path=PHONEMES):
+    """
+    :return: `OrderedDict` mapping Parameter_IDs to `Segmenter` instances.
+    """
+    segments = collections.OrderedDict()
+    with path.open(encoding='utf8', newline='') as fp:
+        for row in csv.DictReader(fp):
+            segments.setdefault(row['Parameter_ID'], []).append(row['Name'])
+    return collections.OrderedDict((pid, Segmenter(pid, s)) for pid, s in segments.items())
+
+
+class Segmenters(object):
+    """
+    The segmenters of all inventory parameters, loaded lazily from a list of known segments - by
+    default `etc/phonemes.csv` of this repository.
+    """
+    def __init__(self, path=PHONEMES):
+        self.path = path
+        self._segmenters = None
+        # (mtime, size) of the file the segmenters were loaded from:
+        self._stat = None
+
+    def use(self, path):
+        """
+        Switch to the list of known segments at `path` - e.g. in `etc/` of the dataset being built -
+        reloading the segmenters if the file changed.
+        """
+        stat = path.stat()
+        if path != self.path or (stat.st_mtime_ns, stat.st_size) != self._stat:
+            self.path, self._segmenters = path, None
+
+    def __getitem__(self, pid):
+        if self._segmenters is None:
+            stat = self.path.stat()
+            self._segmenters, self._stat = \
+                load_segmenters(self.path), (stat.st_mtime_ns, stat.st_size)
+        return self._segmenters[pid]
+
+
+SEGMENTERS = Segmenters()
@@ -0,0 +1,131 @@
+"""
+Instrumentation of the `makecldf` build: Wall time per stage, and call counts and cumulative time
+for the functions on the hot path, i.e. the converters and parameter getters in `sections`.
+"""
+import sys
+import json
+import time
+import collections
+import contextlib
+try:
+    import resource
+except ImportError:  # pragma: no cover
+    resource = None
+
+import attr
+
+__all__ = ['Stats', 'NOSTATS', 'peak_memory']
+
+
+def peak_memory():
+    """
+    :return: Peak resident set size of the process in MB - or `None`, if the platform doesn't \
+    report it.
+    """
+    if resource:
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is given in bytes on macOS, in kilobytes elsewhere:
+        return rss / 2 ** 20 if sys.platform == 'darwin' else rss / 2 ** 10
+
+
+class NullStats(object):
+    """
+    Stand-in for `Stats`, when a build is not instrumented.
+    """
+    @contextlib.contextmanager
+    def stage(self, name):
+        yield
+
+    def iter(self, name, items):
+        return items
+
+    def call(self, group, name, func, *args, **kw):
+        return func(*args, **kw)
+
+    def count(self, name, n=1):
+        pass
+
+    def converters(self, cls, kw):
+        pass
+
+
+NOSTATS = NullStats()
+
+
+class Stats(NullStats):
+    def __init__(self):
+        self.stages = collections.OrderedDict()
+        self.calls = collections.OrderedDict()
+        self.counts = collections.Counter()
+        self._start = time.perf_counter()
+
+    def _add(self, group, name, secs):
+        calls = self.calls.setdefault(group, {}).setdefault(name, [0, 0.0])
+        calls[0] += 1
+        calls[1] += secs
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    def iter(self, name, items):
+        """
+        Iterate over `items`, adding the time spent in producing the items to stage `name`.
+        """
+        items = iter(items)
+        while True:
+            with self.stage(name):
+                try:
+                    item = next(items)
+                except StopIteration:
+                    return
+            yield item
+
+    def call(self, group, name, func, *args, **kw):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kw)
+        finally:
+            self._add(group, name, time.perf_counter() - start)
+
+    def count(self, name, n=1):
+        self.counts[name] += n
+
+    def converters(self, cls, kw):
+        """
+        Time the attribute converters of attrs class `cls` for the raw values in `kw`.
+
+        Converters are called from within the generated `__init__` of the class, thus can't be
+        timed individually when instantiating `cls` - so we call them a second time here.
+        """
+        for field in attr.fields(cls):
+            if field.converter and field.name in kw:
+                self.call(
+                    'converter',
+                    '{0}.{1}'.format(cls.__name__, field.name),
+                    field.converter,
+                    kw[field.name])
+
+    def as_json(self):
+        # Stages may be nested (e.g. "parse" and "extraction" within "values"), so we report wall
+        # time since instantiation as total:
+        total = time.perf_counter() - self._start
+        return collections.OrderedDict([
+            ('stages', self.stages),
+            ('total', total),
+            ('counts', self.counts),
+            ('rows_per_second', (self.counts['rows'] / total) if total else None),
+            ('calls', collections.OrderedDict(
+                (group, collections.OrderedDict(
+                    (name, {'count': c, 'seconds': s}) for name, (c, s) in sorted(
+                        calls.items(), key=lambda i: -i[1][1])))
+                for group, calls in self.calls.items())),
+        ])
+
+    def write(self, path):
+        with path.open('w', encoding='utf8') as fp:
+            json.dump(self.as_json(), fp, indent=4)
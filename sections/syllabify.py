@@ -0,0 +1,305 @@
+"""
+Syllabification of transcribed words, driven by the phonotactics extracted for each language:
+
+- the segments of a word are the phonemes of the consonant, vowel and diphthong inventories,
+  matched longest first,
+- licit syllables are the shapes of the canonical syllable structure template - or, without
+  template, shapes with onsets and codas up to the maximal sizes - restricted by the maximal sizes
+  of onset and coda and by obligatory onsets or codas.
+
+Words are split into licit syllables, with syllable boundaries as early as possible, i.e. following
+the maximal onset principle.
+
+The compiled syllabifiers of all languages are cached in a directory, keyed by a hash of the
+ValueTable. Word lists are syllabified as a stream - optionally in a pool of processes - reporting
+the throughput.
+"""
+import time
+import pickle
+import hashlib
+import pathlib
+import itertools
+import collections
+import concurrent.futures
+
+from .segments import Trie, normalize
+from .templates import compile_template
+from .check import _tables, _rows
+from .util import normalize_phoneme
+
+__all__ = ['Syllabifier', 'load_syllabifiers', 'syllabify', 'Throughput']
+
+# Maps Parameter_IDs of inventories to the class of their segments:
+INVENTORIES = collections.OrderedDict([
+    ('Consonant_inventory', 'C'),
+    ('Vowel_inventory', 'V'),
+    ('Diphtong_inventory', 'V'),
+])
+PARAMS = list(INVENTORIES) + [
+    'Canonical_syllable_structure',
+    'Size_of_maximal_onset',
+    'Size_of_maximal_coda',
+    'Onset_obligatory',
+    'Coda_obligatory',
+]
+
+
+def _margins(shape):
+    """
+    :return: `tuple` (onset, coda) of the sizes of onset and coda of a shape like "CCVC".
+    """
+    if 'V' not in shape:
+        return 0, 0
+    return shape.index('V'), len(shape) - shape.rindex('V') - 1
+
+
+class Syllabifier(object):
+    def __init__(self,
+                 inventories,
+                 template=None,
+                 max_onset=None,
+                 max_coda=None,
+                 onset_obligatory=False,
+                 coda_obligatory=False):
+        """
+        :param inventories: `dict` mapping "C" and "V" to iterables of segments.
+        :param template: Canonical syllable structure template, e.g. "(C)(C)V(C)".
+        """
+        self._trie = Trie()
+        for cls, segments in inventories.items():
+            for segment in segments:
+                segment = normalize(normalize_phoneme(segment))
+                if segment:
+                    self._trie.add(segment, (segment, cls))
+        if template:
+            shapes = compile_template(template).shapes
+        elif max_onset is not None and max_coda is not None:
+            shapes = [
+                'C' * onset + 'V' + 'C' * coda
+                for onset in range(max_onset + 1) for coda in range(max_coda + 1)]
+        else:
+            raise ValueError('No syllable structure')
+        self.shapes = set()
+        for shape in shapes:
+            onset, coda = _margins(shape)
+            if (max_onset is None or onset <= max_onset) \
+                    and (max_coda is None or coda <= max_coda) \
+                    and (onset or not onset_obligatory) \
+                    and (coda or not coda_obligatory):
+                self.shapes.add(shape)
+        if not self.shapes:
+            raise ValueError('No licit syllable shapes')
+        self._max_length = max(len(shape) for shape in self.shapes)
+        # Memoized splits of sequences of segment classes - which recur a lot in word lists:
+        self._splits = {}
+
+    def _segment(self, token):
+        # Fast path: Taking the longest match at each position - which is what `Trie.segment`
+        # does, unless it has to backtrack:
+        res, i, n = [], 0, len(token)
+        while i < n:
+            node, match = self._trie.root, None
+            for j in range(i, n):
+                node = node.get(token[j])
+                if node is None:
+                    break
+                if None in node:
+                    match = j + 1, node[None]
+            if match is None:
+                return self._trie.segment(token)
+            i = match[0]
+            res.append(match[1])
+        return res
+
+    def segments(self, word):
+        """
+        :return: `list` of pairs (segment, class) - or `None`, if `word` can't be segmented.
+        """
+        res = []
+        for token in normalize(word).split():
+            segments = self._segment(token)
+            if segments is None:
+                return None
+            res.extend(segments)
+        return res
+
+    def split(self, classes):
+        """
+        :param classes: `str` of segment classes, e.g. "CVCCV".
+        :return: `tuple` of the end positions of the syllables - or `None`, if `classes` can't be \
+        split into licit syllables.
+        """
+        if classes not in self._splits:
+            n = len(classes)
+
+            def ends(i):
+                return (
+                    j for j in range(i + 1, min(n, i + self._max_length) + 1)
+                    if classes[i:j] in self.shapes)
+
+            # Whether the segments from position i on can be split into licit syllables:
+            feasible = [False] * n + [True]
+            for i in range(n - 1, -1, -1):
+                feasible[i] = any(feasible[j] for j in ends(i))
+            res = None
+            if feasible[0]:
+                res, i = [], 0
+                while i < n:
+                    i = next(j for j in ends(i) if feasible[j])
+                    res.append(i)
+                res = tuple(res)
+            self._splits[classes] = res
+        return self._splits[classes]
+
+    def __call__(self, word):
+        """
+        :return: `list` of syllables - or `None`, if `word` can't be syllabified.
+        """
+        segments = self.segments(word)
+        if not segments:
+            return None
+        ends = self.split(''.join(cls for _, cls in segments))
+        if ends is None:
+            return None
+        return [
+            ''.join(segment for segment, _ in segments[i:j]) for i, j in zip((0,) + ends, ends)]
+
+
+def _syllabifier(values):
+    """
+    :param values: `dict` mapping Parameter_IDs to `list` s of values of one language.
+    """
+    def size(pid):
+        return int(values[pid][0]) if pid in values else None
+
+    inventories = collections.defaultdict(list)
+    for pid, cls in INVENTORIES.items():
+        inventories[cls].extend(values.get(pid, []))
+    if not (inventories['C'] and inventories['V']):
+        raise ValueError('No inventories')
+    return Syllabifier(
+        inventories,
+        template=values.get('Canonical_syllable_structure', [None])[0],
+        max_onset=size('Size_of_maximal_onset'),
+        max_coda=size('Size_of_maximal_coda'),
+        onset_obligatory=values.get('Onset_obligatory') == ['Yes'],
+        coda_obligatory=values.get('Coda_obligatory') == ['Yes'])
+
+
+def load_syllabifiers(cldf_dir, cache_dir=None):
+    """
+    Compile the syllabifiers of all languages with inventories and syllable structure - or load
+    them from `cache_dir`, if the ValueTable didn't change.
+
+    :return: `dict` mapping Language_IDs to `Syllabifier` instances.
+    """
+    table = _tables(cldf_dir)[0]['ValueTable']
+    md5 = hashlib.md5(table.read_bytes())
+    md5.update(pathlib.Path(__file__).read_bytes())
+    cached = cache_dir / 'syllabifiers-{0}.pickle'.format(md5.hexdigest()) if cache_dir else None
+    if cached and cached.exists():
+        with cached.open('rb') as fp:
+            return pickle.load(fp)
+
+    values = collections.defaultdict(lambda: collections.defaultdict(list))
+    for row in _rows(table):
+        if row['Parameter_ID'] in PARAMS:
+            values[row['Language_ID']][row['Parameter_ID']].append(row['Value'])
+    res = {}
+    for lid, v in values.items():
+        try:
+            res[lid] = _syllabifier(v)
+        except ValueError:
+            continue
+
+    if cached:
+        if not cache_dir.exists():
+            cache_dir.mkdir(parents=True)
+        for p in cache_dir.glob('syllabifiers-*.pickle'):
+            p.unlink()
+        with cached.open('wb') as fp:
+            pickle.dump(res, fp, protocol=pickle.HIGHEST_PROTOCOL)
+    return res
+
+
+class Throughput(object):
+    """
+    Counts of syllabified words and the throughput in words per second.
+    """
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.words = 0
+        self.failed = 0
+
+    @property
+    def seconds(self):
+        return time.perf_counter() - self.start
+
+    @property
+    def words_per_second(self):
+        return self.words / self.seconds
+
+    def __str__(self):
+        return '{0} words ({1} failed) in {2:.1f}s: {3:.0f} words/s'.format(
+            self.words, self.failed, self.seconds, self.words_per_second)
+
+
+# The syllabifiers in a worker process:
+_SYLLABIFIERS = {}
+
+
+def _init(syllabifiers):
+    _SYLLABIFIERS.update(syllabifiers)
+
+
+def _syllabify_chunk(chunk, syllabifiers=None):
+    syllabifiers = _SYLLABIFIERS if syllabifiers is None else syllabifiers
+    res = []
+    for lid, word in chunk:
+        syllabifier = syllabifiers.get(lid)
+        res.append((lid, word, syllabifier(word) if syllabifier else None))
+    return res
+
+
+def syllabify(words, syllabifiers, workers=1, chunksize=1000, throughput=None):
+    """
+    Syllabify a stream of words - in chunks, in a pool of `workers` processes if `workers > 1`.
+
+    Results are generated in the order of `words`, and only a small window of chunks is processed
+    ahead, to keep memory use bounded.
+
+    :param words: Iterable of pairs (Language_ID, word).
+    :param syllabifiers: `dict` mapping Language_IDs to `Syllabifier` instances.
+    :param throughput: Optional `Throughput` instance to update.
+    :return: Generator of triples (Language_ID, word, syllables), with syllables being `None` for \
+    words which can't be syllabified - or of languages without syllabifier.
+    """
+    workers = int(workers or 1)
+    words = iter(words)
+    chunks = iter(lambda: list(itertools.islice(words, chunksize)), [])
+    executor = concurrent.futures.ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init,
+        initargs=(syllabifiers,)) if workers > 1 else None
+    pending = collections.deque()
+
+    def resolve(future):
+        res = future.result() if executor else future
+        if throughput is not None:
+            throughput.words += len(res)
+            throughput.failed += sum(1 for r in res if r[2] is None)
+        return res
+
+    try:
+        for chunk in chunks:
+            if executor:
+                pending.append(executor.submit(_syllabify_chunk, chunk))
+            else:
+                pending.append(_syllabify_chunk(chunk, syllabifiers))
+            while len(pending) > workers * 4:
+                yield from resolve(pending.popleft())
+        while pending:
+            yield from resolve(pending.popleft())
+    finally:
+        if executor:
+            executor.shutdown()
@@ -0,0 +1,212 @@
+"""
+Canonical syllable structure templates like "(C)(C)V(C)", compiled into small automata.
+
+A template is a sequence of C and V symbols, with optional - possibly nested - groups in
+parentheses. We read it as a linear automaton with one state per position and epsilon transitions
+skipping optional groups, and compile this into a deterministic automaton over {C, V}, which is
+acyclic - and typically has no more states than the template has symbols. From the automaton we
+read off
+- the maximal onset, i.e. the longest run of Cs before a V,
+- the maximal coda, i.e. the longest run of Cs after a V, at the end of a shape,
+- the number of licit shapes and the shapes themselves, e.g. "V", "CV", "CCV", "VC", ...
+
+The shapes of the templates of all languages are collected in a `TemplateIndex`, to answer queries
+like "which languages license CCCVCC" or "which templates subsume (C)V(C)" without compiling
+templates again.
+"""
+import json
+import functools
+import collections
+
+__all__ = ['SyllableTemplate', 'compile_template', 'TemplateIndex']
+
+SYMBOLS = 'CV'
+
+
+def _parse(template):
+    """
+    :return: `tuple` (symbols, skips) of the `str` of C and V symbols of the template and the \
+    `list` of pairs (i, j) of positions in `symbols` delimiting optional groups.
+    """
+    symbols, skips, stack = [], [], []
+    for c in template:
+        if c == '(':
+            stack.append(len(symbols))
+        elif c == ')':
+            if not stack:
+                raise ValueError('Unbalanced parentheses in template: {0}'.format(template))
+            start = stack.pop()
+            if start == len(symbols):
+                raise ValueError('Empty group in template: {0}'.format(template))
+            skips.append((start, len(symbols)))
+        elif c in SYMBOLS:
+            symbols.append(c)
+        else:
+            raise ValueError('Invalid symbol in template: {0}'.format(template))
+    if stack:
+        raise ValueError('Unbalanced parentheses in template: {0}'.format(template))
+    if not symbols:
+        raise ValueError('Empty template')
+    return ''.join(symbols), skips
+
+
+class SyllableTemplate(object):
+    def __init__(self, template):
+        self.template = template
+        symbols, skips = _parse(template)
+        n = len(symbols)
+
+        def closure(positions):
+            res, todo = set(positions), list(positions)
+            while todo:
+                i = todo.pop()
+                for start, stop in skips:
+                    if start == i and stop not in res:
+                        res.add(stop)
+                        todo.append(stop)
+            return frozenset(res)
+
+        # Subset construction - states of the deterministic automaton are sets of positions:
+        states = [closure([0])]
+        index = {states[0]: 0}
+        # A `list` of `dict` s mapping symbols to the target state per state:
+        self.transitions = []
+        while len(self.transitions) < len(states):
+            targets = {}
+            for symbol in SYMBOLS:
+                source = states[len(self.transitions)]
+                state = closure([i + 1 for i in source if i < n and symbols[i] == symbol])
+                if state:
+                    if state not in index:
+                        index[state] = len(states)
+                        states.append(state)
+                    targets[symbol] = index[state]
+            self.transitions.append(targets)
+        self.accepting = frozenset(i for i, state in enumerate(states) if n in state)
+
+    def __repr__(self):
+        return '<SyllableTemplate {0}>'.format(self.template)
+
+    def __len__(self):
+        """
+        The number of licit shapes, i.e. of paths through the - acyclic - automaton.
+        """
+        counts = {}
+
+        def count(state):
+            if state not in counts:
+                counts[state] = int(state in self.accepting) + \
+                    sum(count(t) for t in self.transitions[state].values())
+            return counts[state]
+
+        return count(0)
+
+    def _c_run(self, state):
+        """
+        :return: `list` of the states reached from `state` by reading only Cs - starting with \
+        `state`.
+        """
+        res = [state]
+        while 'C' in self.transitions[res[-1]]:
+            res.append(self.transitions[res[-1]]['C'])
+        return res
+
+    @property
+    def max_onset(self):
+        """
+        Size of the maximal onset - or `None` if the template has no V.
+        """
+        onsets = [i for i, s in enumerate(self._c_run(0)) if 'V' in self.transitions[s]]
+        return max(onsets) if onsets else None
+
+    @property
+    def max_coda(self):
+        """
+        Size of the maximal coda - or `None` if the template has no V.
+        """
+        codas = [
+            i
+            for targets in self.transitions if 'V' in targets
+            for i, s in enumerate(self._c_run(targets['V'])) if s in self.accepting]
+        return max(codas) if codas else None
+
+    def accepts(self, shape):
+        state = 0
+        for symbol in shape:
+            state = self.transitions[state].get(symbol)
+            if state is None:
+                return False
+        return state in self.accepting
+
+    @property
+    def shapes(self):
+        """
+        The licit shapes, as sorted `list` of `str`.
+        """
+        res, todo = [], [(0, '')]
+        while todo:
+            state, prefix = todo.pop()
+            if state in self.accepting:
+                res.append(prefix)
+            todo.extend(
+                (target, prefix + symbol) for symbol, target in self.transitions[state].items())
+        return sorted(res, key=lambda s: (len(s), s))
+
+
+@functools.lru_cache(maxsize=None)
+def compile_template(template):
+    """
+    :return: The - memoized - `SyllableTemplate` for `template`.
+    """
+    return SyllableTemplate(template)
+
+
+class TemplateIndex(object):
+    def __init__(self):
+        # Maps templates to the `list` of Language_IDs of languages with this template:
+        self.templates = collections.OrderedDict()
+        # Maps shapes to the `list` of templates licensing the shape:
+        self.shapes = collections.defaultdict(list)
+
+    def __len__(self):
+        return len(self.templates)
+
+    def add(self, lid, template):
+        if template not in self.templates:
+            self.templates[template] = []
+            for shape in compile_template(template).shapes:
+                self.shapes[shape].append(template)
+        self.templates[template].append(lid)
+
+    def write(self, path):
+        with path.open('w', encoding='utf8') as fp:
+            json.dump(
+                {'templates': self.templates, 'shapes': self.shapes},
+                fp,
+                separators=(',', ':'))
+
+    @classmethod
+    def load(cls, path):
+        index = cls()
+        with path.open(encoding='utf8') as fp:
+            d = json.load(fp)
+        index.templates.update(d['templates'])
+        index.shapes.update(d['shapes'])
+        return index
+
+    def languages(self, shape):
+        """
+        :return: Sorted `list` of Language_IDs of the languages licensing the shape, e.g. "CCVC".
+        """
+        return sorted(lid for t in self.shapes.get(shape, []) for lid in self.templates[t])
+
+    def subsuming(self, template):
+        """
+        :return: `list` of the templates licensing all shapes licensed by `template`.
+        """
+        postings = [self.shapes.get(shape, []) for shape in compile_template(template).shapes]
+        # Intersecting - starting with the shortest postings:
+        res = set(min(postings, key=len))
+        for p in postings:
+            res.intersection_update(p)
+        return [t for t in self.templates if t in res]
@@ -1,26 +1,73 @@
 import re
+import gc
+import sys
 import base64
+import hashlib
+import functools
+import collections
 
 import attr
 from clldutils.misc import slug
 
 __all__ = [
-    'fix_bibkey', 'parse_refs', 'format_refs', 'convert_text', 'tex_pattern', 'iter_sections',
-    'base16']
+    'fix_bibkey', 'fix_bibkeys', 'parse_refs', 'format_refs', 'convert_text', 'tex_pattern',
+    'iter_sections', 'iter_section_sources', 'parse_sections', 'base16', 'normalize_phoneme',
+    'one_of']
 
 
 def base16(s):
     return base64.b16encode(s.encode('utf8')).decode()
 
 
-def iter_sections(p):
-    return iter_chunks(iter_lines(p), lambda l: l.startswith('\\section*'), Section)
+def one_of(options):
+    """
+    An optional validator, checking membership in `options` - precompiled into a `frozenset`, so
+    validating doesn't mean scanning a list.
+    """
+    return attr.validators.optional(attr.validators.in_(frozenset(options)))
 
 
+def normalize_phoneme(s):
+    # Inventories are given as "/p, t, k/" in the appendix, so the first and last phonemes
+    # come with a slash:
+    return s.strip().strip('/').strip()
+
+
+def iter_sections(p, memoize=True):
+    """
+    Iterate over the language sections of the appendix at path `p` - either from the memoized
+    parse tree or, with `memoize=False`, reading and parsing the sections one by one, so that only
+    the section at hand is held in memory.
+    """
+    if memoize:
+        return iter(parse_sections(p))
+    return (parse_section(data, lineno) for data, lineno in iter_section_sources(p))
+
+
+@functools.lru_cache(maxsize=None)
 def fix_bibkey(t):
     return slug(t, lowercase=False)
 
 
+BIB_ENTRY_PATTERN = re.compile('@(?P<type>[a-z]+){(?P<key>[^,]+),')
+
+
+def fix_bibkeys(lines):
+    """
+    Make sure BibTeX keys are ASCII-only.
+
+    :param lines: Iterable of lines of a BibTeX file as `bytes`.
+    :return: Generator of the fixed lines as `bytes`.
+    """
+    for line in lines:
+        m = BIB_ENTRY_PATTERN.match(line.decode('utf8'))
+        if m:
+            # Note: Anything after the key is dropped - but not the line ending.
+            line = '@{0}{{{1},'.format(m.group('type'), fix_bibkey(m.group('key'))).encode('utf8') \
+                + line[len(line.rstrip(b'\r\n')):]
+        yield line
+
+
 def tex_pattern(cmd, braces='{}'):
     return re.compile('\\\\%s\*?%s(?P<text>[^%s]+)%s' % (
         re.escape(cmd), re.escape(braces[0]), re.escape(braces[1]), re.escape(braces[1])))
@@ -35,151 +82,377 @@ def format_refs(refs):
     return [fmt(r) for r in refs]
 
 
-def parse_refs(s, strip=False):
-    refs = set()
+#
+# TeX markup is converted in a single left-to-right scan with one precompiled pattern, matching
+# citations, the markup commands we know about and the escapes listed below.
+#
+CITE_PATTERNS = [
+    r'\\cite(?:p|t|year)(?:\[(?P<pages>[^\]]+)\])?{(?P<ref>[^}]+)}',
+    r'\\citealt(?:\[(?P<pagesa>[^\]]+)\])?{(?P<refa>[^}]+)}(?::\s*(?P<pagesb>[0-9\-,\s]+))?',
+]
+ESCAPES = collections.OrderedDict([
+    ('\\%', '%'),
+    ('{\\textasciitilde}', '~'),
+    ('\\&', '&'),
+    ('\\textsubscript{2}', '₂'),
+    ('\\~{l}', 'l̃'),
+    ('\\u{}', '̆ '),
+])
+ESCAPE_PATTERN = '(?P<escape>{0})'.format('|'.join(re.escape(k) for k in ESCAPES))
+MARKUP = {
+    'ili': '{0}',
+    'textit': '*{0}*',
+    'textsubscript': '<sub>{0}</sub>',
+    'textsuperscript': '<sup>{0}</sup>',
+}
+# Other markup may contain nested \ili{}, e.g. "\textit{\ili{Georgian}-Zan}":
+ILI_PATTERN = r'\\ili\*?{(?P<ili>[^}]+)}'
+MARKUP_PATTERN = r'\\(?P<cmd>{0})\*?{{(?P<text>(?:\\ili\*?{{[^}}]+}}|[^}}])+)}}'.format('|'.join(MARKUP))
+REFS_PATTERN = re.compile('|'.join(CITE_PATTERNS))
+TEXT_PATTERN = re.compile('|'.join(CITE_PATTERNS + [ESCAPE_PATTERN, MARKUP_PATTERN]))
+INNER_PATTERN = re.compile('|'.join([ESCAPE_PATTERN, ILI_PATTERN]))
+
+
+def _scan(pattern, s, strip):
+    # References from \citealt are listed after the ones from \cite(p|t|year):
+    refs, alt_refs = collections.OrderedDict(), collections.OrderedDict()
 
     def repl(m):
         d = m.groupdict()
+        if d.get('escape'):
+            return ESCAPES[d['escape']]
+        if d.get('cmd'):
+            text = d['text']
+            if '\\' in text:
+                text = INNER_PATTERN.sub(
+                    lambda mm: ESCAPES[mm.group('escape')] if mm.group('escape') else mm.group('ili'),
+                    text)
+            return MARKUP[d['cmd']].format(text)
         pages = d.get('pagesa') or d.get('pagesb') or d.get('pages')
-        for ref in m.group('ref').split(','):
-            ref = ref.strip()
-            refs.add((fix_bibkey(ref), (pages.strip() or None) if pages else None))
+        ref, res = (d['refa'], alt_refs) if d.get('refa') else (d['ref'], refs)
+        for r in ref.split(','):
+            res[(fix_bibkey(r.strip()), (pages.strip() or None) if pages else None)] = None
         if strip:
             return ''
-        res = m.group('ref')
         if pages and pages.strip():
-            res += ': {0}'.format(pages.strip())
-        return res
+            ref += ': {0}'.format(pages.strip())
+        return ref
+
+    s = pattern.sub(repl, s)
+    for k in alt_refs:
+        refs[k] = None
+    return s, tuple(refs)
+
+
+def parse_refs(s, strip=False):
+    s, refs = _scan(REFS_PATTERN, s, strip)
+    return s, list(refs)
+
 
-    s = re.sub(
-        '\\\\cite(p|t|year)(\[(?P<pages>[^\]]+)\])?{(?P<ref>[^}]+)}',
-        repl,
-        s)
-    s = re.sub(
-        '\\\\citealt(\[(?P<pagesa>[^\]]+)\])?{(?P<ref>[^}]+)}(:\s*(?P<pagesb>[0-9\-,\s]+))?',
-        repl,
-        s)
-    return s, refs
+@functools.lru_cache(maxsize=4096)
+def _convert_text(s, strip):
+    return _scan(TEXT_PATTERN, s, strip)
 
 
 def convert_text(s, strip=False, warn_only=False):
     if not s:
         return None
-    s, refs = parse_refs(s, strip=strip)
-    s = tex_pattern('ili').sub(lambda m: m.group('text'), s)
-    s = tex_pattern('textit').sub(lambda m: '*' + m.group('text') + '*', s)
-    for k, v in {
-        '\\%': '%',
-        '{\\textasciitilde}': '~',
-        '\\&': '&',
-        '\\textsubscript{2}': '₂',
-        '\\~{l}': 'l̃',
-        '\\u{}': '̆ ',
-    }.items():
-        s = s.replace(k, v)
-
-    s = tex_pattern('textsubscript').sub(lambda m: '<sub>' + m.group('text') + '</sub>', s)
-    s = tex_pattern('textsuperscript').sub(lambda m: '<sup>' + m.group('text') + '</sup>', s)
+    s, refs = _convert_text(s, strip)
     if '\\' in s:
         if warn_only:
             print(s)
         else:
             raise ValueError(s)
-    return s, refs
+    return s, list(refs)
+
+
+# Markup which is removed from all lines:
+IGNORED_MARKUP = re.compile(r'\\newpage|\\begin\{appendixdesc\}|\\end\{appendixdesc\}')
+
+
+def clean_line(line):
+    if '\\newpage' in line or 'appendixdesc' in line:
+        line = IGNORED_MARKUP.sub('', line)
+    return line.strip()
+
 
+def is_content(line):
+    return line and not line.startswith('%') and not line.startswith('\\addxcontentsline')
+
+
+def iter_numbered_lines(text):
+    for lineno, line in enumerate(text.split('\n'), start=1):
+        line = clean_line(line)
+        if is_content(line):
+            yield lineno, line
+
+
+def iter_lines(p):
+    for _, line in iter_numbered_lines(p.read_text(encoding='utf8')):
+        yield line
+
+
+#
+# The parse tree doesn't copy the TeX source: Its nodes are spans of the one UTF-8 encoded
+# `bytes` buffer of the source, i.e. store the offset of their headline, the offset where the next
+# node starts and the number of their first line. Text is only decoded when accessed.
+#
+@attr.s(slots=True)
+class Span(object):
+    data = attr.ib(repr=False)
+    start = attr.ib()
+    stop = attr.ib()
+    lineno = attr.ib()
+
+    @property
+    def end(self):
+        """
+        Offset of the end of the last line of the span, i.e. not counting trailing empty lines, \
+        comments and ignored markup.
+        """
+        return _content_end(self.data, self.start, self.stop)
 
-@attr.s
-class Item(object):
-    headline = attr.ib()
-    lines = attr.ib()
+    @property
+    def view(self):
+        """
+        A `memoryview` of the bytes of the span - without copying them.
+        """
+        return memoryview(self.data)[self.start:self.end]
+
+    @property
+    def span(self):
+        """
+        :return: `tuple` (first, last) of the numbers of the source lines covered by the span.
+        """
+        return self.lineno, self.lineno + self.data.count(b'\n', self.start, self.end)
+
+    def _headline_end(self):
+        i = self.data.find(b'\n', self.start, self.stop)
+        return self.stop if i < 0 else i
+
+    @property
+    def headline(self):
+        return self._headline(self._headline_end())
+
+    def _headline(self, end):
+        return clean_line(self.data[self.start:end].decode('utf8'))
+
+    @property
+    def lines(self):
+        """
+        :return: `list` of the - cleaned - lines of the span, following the headline.
+        """
+        return [
+            line for _, line in
+            iter_numbered_lines(self.data[self._headline_end() + 1:self.end].decode('utf8'))]
+
+
+@attr.s(slots=True)
+class Item(Span):
     name = attr.ib(default=None)
-    value = attr.ib(default=None)
+    name_pattern = tex_pattern('item', braces='[]')
 
     def __attrs_post_init__(self):
-        self.name = tex_pattern('item', braces='[]').match(self.headline).group('text').strip()
-        if self.name.endswith(':'):
-            self.name = self.name[:-1].strip()
-        if self.name == 'Category':
+        end = self._headline_end()
+        name = self.name_pattern.match(self._headline(end)).group('text').strip()
+        if name.endswith(':'):
+            name = name[:-1].strip()
+        if name == 'Category':
             # https://github.com/langsci/249/issues/2
-            self.name = 'Complexity category'
-        self.value = self.headline.split(']', maxsplit=1)[1].strip()
-        if self.lines:
+            name = 'Complexity category'
+        self.name = sys.intern(name)
+        if not self.data[end:self.stop].isspace() and self.end > end:
             assert '\n'.join(self.lines).startswith('The processes below have quite a few')
 
+    @property
+    def value(self):
+        return self.headline.split(']', maxsplit=1)[1].strip()
+
     @property
     def attribute(self):
         return self.name.replace(' ', '_').replace('-', '_')
 
 
-@attr.s
-class Subsection(object):
-    headline = attr.ib()
-    lines = attr.ib()
+@attr.s(slots=True)
+class Subsection(Span):
+    items = attr.ib(default=attr.Factory(list))
     name = attr.ib(default=None)
+    name_pattern = tex_pattern('subsection')
 
     def __attrs_post_init__(self):
-        self.name = tex_pattern('subsection').match(self.headline).group('text')
+        self.name = sys.intern(self.name_pattern.match(self.headline).group('text'))
 
-    @property
-    def items(self):
-        return list(
-            iter_chunks(self.lines, lambda l: l.startswith('\\item['), Item))
 
-
-@attr.s
-class Section(object):
-    headline = attr.ib()
-    lines = attr.ib()
+@attr.s(slots=True)
+class Section(Span):
+    subsections = attr.ib(default=attr.Factory(list))
     iso = attr.ib(default=None)
     name = attr.ib(default=None)
+    refs = attr.ib(default=None)
     lang_pattern = re.compile('\[(?P<iso>[a-z]{3})\]\s*(?P<name>[^}]+)')
+    ili_pattern = tex_pattern('ili')
+    citet_pattern = tex_pattern('citet')
+    refs_pattern = re.compile(
+        br'^[ \t\r]*(?:(?:' + IGNORED_MARKUP.pattern.encode() + br')[ \t]*)*References consulted',
+        flags=re.MULTILINE)
 
     def __str__(self):
         return '{0.name} [{0.iso}]'.format(self)
 
+    def __reduce__(self):
+        # Pickling a section - e.g. to extract its values in a worker process - must not pickle the
+        # whole buffer, so we re-parse the section from a copy of its own bytes instead.
+        return parse_section, (self.view.tobytes(), self.lineno)
+
+    @property
+    def fingerprint(self):
+        return hashlib.md5(self.view).hexdigest()
+
     def __attrs_post_init__(self):
         text = self.headline
         if '\\ili{' in text:
-            text = tex_pattern('ili').sub(lambda m: m.group('text'), text)
+            text = self.ili_pattern.sub(lambda m: m.group('text'), text)
         m = self.lang_pattern.search(text)
         assert m
         self.iso = m.group('iso')
         self.name = m.group('name')
-
-    @property
-    def refs(self):
-        res = []
-        for line in self.lines:
-            if line.startswith('References consulted'):
-                for m in tex_pattern('citet').finditer(line):
-                    res.append(fix_bibkey(m.group('text')))
-                break
-        return res
-
-    @property
-    def subsections(self):
-        return list(
-            iter_chunks(self.lines, lambda l: l.startswith('\\subsection*'), Subsection))
-
-
-def iter_lines(p):
-    for line in p.read_text(encoding='utf8').split('\n'):
-        for p in {'\\newpage', '\\begin{appendixdesc}', '\\end{appendixdesc}'}:
-            line = line.replace(p, '')
-        line = line.strip()
-        if line and not line.startswith('%') and not line.startswith('\\addxcontentsline'):
-            yield line
-
-
-def iter_chunks(l, condition, cls):
-    lines, section = [], None
-
-    for line in l:
-        if condition(line):
-            if section:
-                yield cls(section, lines)
-            lines, section = [], line
-        else:
-            lines.append(line)
-    if section:
-        yield cls(section, lines)
+        self.refs = []
+        m = self.refs_pattern.search(self.data, self._headline_end() + 1, self.stop)
+        if m:
+            end = self.data.find(b'\n', m.start(), self.stop)
+            line = self.data[m.start():self.stop if end < 0 else end].decode('utf8')
+            for m in self.citet_pattern.finditer(line):
+                self.refs.append(fix_bibkey(m.group('text')))
+
+
+# The lines starting a node of the parse tree - with the number of the matching group being the
+# level of the node in the tree:
+HEADLINE_PATTERN = re.compile(
+    br'^[ \t\r]*(?:(?:' + IGNORED_MARKUP.pattern.encode() + br')[ \t]*)*'
+    br'(?:(\\section\*)|(\\subsection\*)|(\\item\[))',
+    flags=re.MULTILINE)
+NODE_CLASSES = [Section, Subsection, Item]
+NEWLINE = ord('\n')
+PERCENT = ord('%')
+NON_CONTENT = (
+    b'\\newpage', b'\\begin{appendixdesc}', b'\\end{appendixdesc}', b'\\addxcontentsline')
+
+
+def _content_end(data, start, stop):
+    """
+    :return: Offset of the end of the last content line - i.e. not empty or a comment after \
+    cleaning - in `data[start:stop]`.
+    """
+    end = stop
+    while end > start:
+        if data[end - 1] == NEWLINE:
+            end -= 1
+        i = max(data.rfind(b'\n', start, end) + 1, start)
+        line = data[i:end].lstrip()
+        # Lines starting with an ASCII character other than "%" - or with a TeX command we don't
+        # remove - are content lines for sure:
+        if line and line[0] < 128 and line[0] != PERCENT and not line.startswith(NON_CONTENT):
+            return end
+        if line and is_content(clean_line(line.decode('utf8'))):
+            return end
+        end = i
+    return start
+
+
+def parse(text):
+    """
+    Parse the TeX source of the appendix into a tree of `Section`, `Subsection` and `Item` objects
+    in one pass.
+
+    :param text: The TeX source as `str` or UTF-8 encoded `bytes`.
+    """
+    # The tree doesn't contain reference cycles, so we spare ourselves the garbage collector runs,
+    # which would otherwise make parsing time grow faster than linear with the size of the input.
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return list(iter_parse(text))
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+
+def parse_section(data, lineno=1):
+    return next(iter_parse(data, lineno=lineno))
+
+
+def iter_parse(text, lineno=1):
+    """
+    Generate the `Section` objects of the appendix one by one, as `parse` would return them.
+
+    :param lineno: Number of the first line of `text`.
+    """
+    data = text.encode('utf8') if isinstance(text, str) else text
+    # The nodes we are currently collecting children for, as lists [class, start, lineno, children]
+    # - from the section down to the item:
+    stack, pos = [], 0
+
+    def close(level, stop):
+        """
+        Close the open nodes on `level` and below, returning the section if it was closed.
+        """
+        while len(stack) > level:
+            cls, start, first, children = stack.pop()
+            node = Item(data, start, stop, first) if cls is Item \
+                else cls(data, start, stop, first, children)
+            if not stack:
+                return node
+            stack[-1][3].append(node)
+
+    for m in HEADLINE_PATTERN.finditer(data):
+        lineno += data.count(b'\n', pos, m.start())
+        pos = m.start()
+        level = m.lastindex - 1
+        if level > len(stack):
+            # Subsections outside of sections and items outside of subsections are ignored.
+            continue
+        sec = close(level, pos)
+        if sec:
+            yield sec
+        stack.append([NODE_CLASSES[level], pos, lineno, []])
+    if stack:
+        yield close(0, len(data))
+
+
+SECTION_PATTERN = re.compile(
+    br'[ \t\r]*(?:(?:' + IGNORED_MARKUP.pattern.encode() + br')[ \t]*)*\\section\*')
+
+
+def iter_section_sources(p):
+    """
+    Read the appendix at path `p` line by line, splitting it at the headlines of the sections.
+
+    :return: Generator of pairs (data, lineno) of the `bytes` of a language section - from its \
+    headline up to the next section - and the number of its first line.
+    """
+    lines, lineno = [], None
+    with p.open('rb') as fp:
+        for i, line in enumerate(fp, start=1):
+            if SECTION_PATTERN.match(line):
+                if lines:
+                    yield b''.join(lines), lineno
+                lines, lineno = [], i
+            if lineno:
+                lines.append(line)
+    if lines:
+        yield b''.join(lines), lineno
+
+
+_PARSED = {}
+
+
+def parse_sections(p):
+    """
+    Parse the appendix at path `p`, memoizing the result as long as the file doesn't change.
+    """
+    stat = p.stat()
+    key = (str(p.resolve()), stat.st_mtime_ns, stat.st_size)
+    if key not in _PARSED:
+        _PARSED.clear()
+        _PARSED[key] = parse(p.read_bytes())
+    return _PARSED[key]
@@ -4,12 +4,16 @@ from setuptools import setup
 setup(
     name='cldfbench_easterdaysyllablestructure',
     py_modules=['cldfbench_easterdaysyllablestructure'],
+    packages=['sections', 'easterdaycommands'],
     include_package_data=True,
     zip_safe=False,
     entry_points={
         'cldfbench.dataset': [
             'easterdaysyllablestructure=cldfbench_easterdaysyllablestructure:Dataset',
-        ]
+        ],
+        'cldfbench.commands': [
+            'easterday=easterdaycommands',
+        ],
     },
     install_requires=[
         'cldfbench',
@@ -17,6 +21,10 @@ setup(
     extras_require={
         'test': [
             'pytest-cldf',
+            'numpy',
+        ],
+        'matrix': [
+            'numpy',
         ],
     },
 )
@@ -1,8 +1,480 @@
+import csv
+import time
+import pickle
+import logging
+import pathlib
+import argparse
+import threading
+
+import pytest
+from cldfbench.datadir import DataDir
+from clldutils.clilib import ParserError
+
+from sections.glottolog import Languoid, LanguoidIndex
+from sections.util import parse, iter_sections
+from sections import SCHEMA
+from sections.schema import ValueIDs
+from sections.matrix import MatrixBuilder, Matrix
+from sections.distance import Gower
+from sections.db import DatabaseBuilder, Database
+from sections.phonemes import PhonemeIndex
+from sections.cube import Cube
+from sections.cache import read_bib, code_version
+from sections.download import download
+from sections.util import fix_bibkeys
+from sections.check import check, check_templates
+from sections.segments import Segmenter, Segmenters
+from sections.search import SearchIndex
+from sections.diff import diff
+from sections.templates import compile_template, TemplateIndex
+from sections.syllabify import Syllabifier, load_syllabifiers, syllabify, Throughput
+from sections.daemon import BuildDaemon, request, RESTART
+from cldfbench_easterdaysyllablestructure import Dataset
+
 
 def test_valid(cldf_dataset, cldf_logger):
     assert cldf_dataset.validate(log=cldf_logger)
 
 
+def test_check():
+    assert check(pathlib.Path(__file__).parent / 'cldf') == []
+
+
 def test_ext(cldf_dataset, cldf_logger):
     assert len(list(cldf_dataset['LanguageTable'])) == 100
     assert len(list(cldf_dataset['ParameterTable'])) == 48
+
+
+def test_LanguoidIndex(tmp_path):
+    index = LanguoidIndex(tmp_path / 'glottolog.json')
+    index.version, index._languoids = 'v4.1', {'abc': Languoid('abcd1234', 1.5, None, ['Eurasia'])}
+    index.write()
+    index = LanguoidIndex(tmp_path / 'glottolog.json')
+    assert index._languoids is None
+    assert 'abc' in index and index['abc'].macroareas == ['Eurasia'] and index.version == 'v4.1'
+
+
+def test_glottolog_index(tmp_path):
+    args = argparse.Namespace(offline=True)
+    assert len(Dataset().glottolog_index(args)) == 100
+    with pytest.raises(ParserError):
+        type('Dataset', (Dataset,), {'dir': tmp_path})().glottolog_index(args)
+
+
+def test_makecldf(tmp_path, caplog):
+    # A dataset with the first five language sections of the appendix:
+    repo = pathlib.Path(__file__).parent
+    lines = repo.joinpath('raw', 'data.tex').read_text(encoding='utf8').split('\n')
+    starts = [i for i, line in enumerate(lines) if line.startswith('\\section*')]
+    appendix = tmp_path / 'raw' / 'data.tex'
+    for d in ['raw', 'etc']:
+        tmp_path.joinpath(d).mkdir()
+    appendix.write_text('\n'.join(lines[:starts[5]]) + '\n}\n', encoding='utf8')
+    for name in [
+        'raw/sources.bib',
+        'etc/languages.csv',
+        'etc/phonemes.csv',
+        'etc/glottolog.json',
+        'metadata.json',
+    ]:
+        tmp_path.joinpath(name).write_bytes(repo.joinpath(name).read_bytes())
+    ds = type('Dataset', (Dataset,), {'dir': tmp_path})()
+
+    def values(**kw):
+        caplog.clear()
+        ds._cmd_makecldf(argparse.Namespace(log=logging.getLogger(__name__), offline=True, **kw))
+        with tmp_path.joinpath('cldf', 'values.csv').open(encoding='utf8', newline='') as fp:
+            return list(csv.DictReader(fp))
+
+    def re_extracted():
+        return [r.getMessage() for r in caplog.records if 're-extracted' in r.getMessage()]
+
+    caplog.set_level(logging.INFO)
+    full = values(full=True)
+    assert len({row['Language_ID'] for row in full}) == 5
+    assert values() == full and re_extracted() == ['0 of 5 language sections re-extracted']
+    assert values(workers=2) == full
+    assert values(stream=True) == full
+
+    # Editing a section re-extracts only this section - with the same result as a full build:
+    appendix.write_text(
+        appendix.read_text(encoding='utf8').replace(
+            '\\item[N elaborations:] 4', '\\item[N elaborations:] 5', 1),
+        encoding='utf8')
+    edited = values()
+    assert re_extracted() == ['1 of 5 language sections re-extracted']
+    assert edited != full and edited == values(full=True)
+    assert values(full=True, workers=2) == values(full=True, stream=True) == edited
+
+
+def test_parse():
+    secs = parse("""\\section*{[abc] Name}
+References consulted: \\citet{A2000}
+
+\\subsection*{Sound inventory}
+\\begin{appendixdesc}
+\\item[N vowel qualities:] 3
+% comment
+
+\\item[Notes:] Some notes
+\\end{appendixdesc}
+""")
+    assert len(secs) == 1 and secs[0].iso == 'abc' and secs[0].refs == ['A2000']
+    assert secs[0].span == (1, 9)
+    items = secs[0].subsections[0].items
+    assert [i.name for i in items] == ['N vowel qualities', 'Notes']
+    assert items[1].span == (9, 9) and items[1].value == 'Some notes'
+    # Sections are pickled as copies of their own bytes, keeping line numbers and fingerprint:
+    sec = pickle.loads(pickle.dumps(secs[0]))
+    assert len(sec.data) < len(secs[0].data) and sec.fingerprint == secs[0].fingerprint
+    assert sec.subsections[0].items[1].span == (9, 9) and sec.refs == ['A2000']
+
+
+def test_iter_sections():
+    # Streamed sections are parsed from their own bytes - with the same content as when parsed
+    # from the whole appendix:
+    p = pathlib.Path(__file__).parent / 'raw' / 'data.tex'
+    streamed = list(iter_sections(p, memoize=False))
+    assert [(s.iso, s.fingerprint, s.span) for s in streamed] == \
+        [(s.iso, s.fingerprint, s.span) for s in iter_sections(p)]
+    assert sum(len(s.data) for s in streamed) < p.stat().st_size
+
+
+def test_SCHEMA():
+    params = {p.id: p for ps in SCHEMA.values() for p in ps}
+    assert len(params) == 46
+    assert params['Consonant_inventory'].multichoice
+    assert params['Tone'].codes['Not reported'] == 'Tone-notreported'
+    assert params['Tone'].as_row()['datatype'] == 'categorical'
+
+
+def test_ValueIDs():
+    ids = ValueIDs()
+    tone = {'Language_ID': 'abc', 'Parameter_ID': 'Tone', 'Value': 'Yes', 'Code_ID': 'Tone-yes'}
+    notes = {'Language_ID': 'abc', 'Parameter_ID': 'Tone_notes', 'Value': 'Some notes'}
+    assert ids(tone) == 'abc-Tone-yes' and ids(tone) == 'abc-Tone-yes-2'
+    assert ids(notes) == ValueIDs()(notes) and ids(notes).endswith('-2')
+
+
+def test_Matrix(tmp_path):
+    pytest.importorskip('numpy')
+    builder = MatrixBuilder(SCHEMA)
+    for row in [
+        {'Language_ID': 'abc', 'Parameter_ID': 'Tone', 'Code_ID': 'Tone-yes', 'Value': 'yes'},
+        {'Language_ID': 'abc', 'Parameter_ID': 'Vowel_inventory', 'Code_ID': 'v-a', 'Value': 'a'},
+        {'Language_ID': 'abc', 'Parameter_ID': 'Vowel_inventory', 'Code_ID': 'v-i', 'Value': 'i'},
+        {'Language_ID': 'abc', 'Parameter_ID': 'R', 'Value': 'text'},
+        {'Language_ID': 'xyz', 'Parameter_ID': 'N_consonants', 'Value': 21},
+        {'Language_ID': 'xyz', 'Parameter_ID': 'Vowel_inventory', 'Code_ID': 'v-i', 'Value': 'i'},
+    ]:
+        builder.add(row)
+    builder.write(tmp_path / 'matrix')
+    m = Matrix.load(tmp_path / 'matrix')
+    assert m.languages == ['abc', 'xyz']
+    assert m.value('abc', 'Tone') == 'Tone-yes' and m.value('xyz', 'Tone') is None
+    assert m.value('abc', 'Vowel_inventory') == ['v-a', 'v-i']
+    assert m['Vowel_inventory'].tolist() == [[True, True], [False, True]]
+    assert m.value('xyz', 'N_consonants') == 21 and m.value('abc', 'N_consonants') is None
+    assert 'R' not in m
+
+
+def test_Gower(tmp_path):
+    pytest.importorskip('numpy')
+    builder = MatrixBuilder(SCHEMA)
+    for lid, tone, vowels, n in [
+        ('abc', 'Tone-yes', ['v-a', 'v-i'], 10),
+        ('def', 'Tone-no', ['v-i'], 20),
+        ('xyz', None, [], 30),
+    ]:
+        if tone:
+            builder.add({'Language_ID': lid, 'Parameter_ID': 'Tone', 'Code_ID': tone})
+        for cid in vowels:
+            builder.add({'Language_ID': lid, 'Parameter_ID': 'Vowel_inventory', 'Code_ID': cid})
+        builder.add({'Language_ID': lid, 'Parameter_ID': 'N_consonants', 'Value': n})
+    builder.write(tmp_path / 'matrix')
+    m = Matrix.load(tmp_path / 'matrix')
+    g = Gower(m, cache_dir=tmp_path / 'cache')
+    assert g.nearest('abc') == [('def', pytest.approx(2 / 3)), ('xyz', 1.0)]
+    assert g.nearest('xyz', k=1) == [('def', 0.5)]
+    d = g.distances()
+    assert d[0, 1] == d[1, 0] and d[0, 0] == 0
+    indices, distances = g.knn(k=1)
+    assert indices[:, 0].tolist() == [1, 2, 1]
+    assert Gower(m, cache_dir=tmp_path / 'cache').knn(k=1)[0].tolist() == indices.tolist()
+    assert len(list((tmp_path / 'cache').iterdir())) == 2
+    # Weights apply to their parameters, whatever the order of parameters of different kinds:
+    weights = {'Tone': 3, 'Vowel_inventory': 2}
+    expected = [('def', pytest.approx((3 * 1 + 2 * 0.5 + 0.5) / 6))]
+    for columns in [m._columns, dict(reversed(list(m._columns.items())))]:
+        m._columns = columns
+        g = Gower(m, weights=weights)
+        assert g.nearest('abc', k=1) == expected and g.block(0, 1)[0, 0] == 0
+    g = Gower(m, weights={'Tone': 0}, sections=['Suprasegmentals'])
+    assert g.nearest('abc') == [] and g.key != Gower(m).key
+
+
+def test_Database(tmp_path):
+    builder = DatabaseBuilder(tmp_path / 'db.sqlite')
+    builder.add('language', {'ID': 'abc', 'Name': 'A', 'Source': ['A2000']})
+    builder.add('language', {'ID': 'xyz', 'Name': 'X'})
+    builder.add('code', {'ID': 'Tone-yes', 'Name': 'Yes', 'Parameter_ID': 'Tone'})
+    for i, (lid, pid, v, cid) in enumerate([
+        ('abc', 'Tone', 'Yes', 'Tone-yes'),
+        ('abc', 'Consonant_inventory', '/ʔ', 'Consonant_inventory-1'),
+        ('xyz', 'Consonant_inventory', 'ʔ/', 'Consonant_inventory-2'),
+    ]):
+        builder.add(
+            'value',
+            {'ID': str(i), 'Language_ID': lid, 'Parameter_ID': pid, 'Value': v, 'Code_ID': cid})
+    builder.close()
+    db = Database(tmp_path / 'db.sqlite')
+    assert db.values('abc', 'Tone') == [('Yes', 'Tone-yes')]
+    assert db.languages(phonemes=['ʔ']) == {'abc', 'xyz'}
+    assert db.languages(phonemes=['ʔ'], Tone='Yes') == db.languages(Tone='Tone-yes') == {'abc'}
+    assert db.languages() == {'abc', 'xyz'}
+    db.close()
+
+
+def test_PhonemeIndex(tmp_path):
+    pytest.importorskip('numpy')
+    PhonemeIndex.from_inventories({
+        'abc': ['/p', 't', 'k/', '/a', 'i/'],
+        'def': ['/p', 't/', '/a/'],
+        'xyz': ['/m/', '/a', 'i/'],
+    }).write(tmp_path)
+    index = PhonemeIndex.load(tmp_path)
+    assert index.inventory('def') == {'p', 't', 'a'}
+    assert index.containing(['p', 'a']) == ['abc', 'def'] and index.containing(['q']) == []
+    assert index.within(['p', 't', 'a', 'm', 'i']) == ['def', 'xyz']
+    assert index.jaccard()[0, 1] == pytest.approx(0.6)
+    assert index.most_similar('abc', k=5) == [
+        ('def', pytest.approx(0.6)), ('xyz', pytest.approx(2 / 6))]
+
+
+def test_Cube(tmp_path):
+    def values(tone, complexity='Simple'):
+        return [
+            {'Parameter_ID': 'Tone', 'Value': tone, 'Code_ID': 'Tone-' + tone},
+            {'Parameter_ID': 'Complexity_category', 'Value': complexity, 'Code_ID': 'CC'},
+            {'Parameter_ID': 'R', 'Value': 'text'},
+        ]
+
+    cube = Cube()
+    assert cube.update('abc', 'Africa', values('yes'))
+    assert cube.update('def', 'Eurasia', values('yes', 'Complex'))
+    cube.write(tmp_path / 'cube.json')
+    cube = Cube.load(tmp_path / 'cube.json')
+    assert not cube.update('abc', 'Africa', values('yes'))
+    assert cube.summary('Tone', by='complexity') == {'Tone-yes': {'Complex': 1, 'Simple': 1}}
+    assert cube.update('abc', 'Africa', values('no'))
+    assert cube.summary('Tone') == {'Tone-no': 1, 'Tone-yes': 1}
+    assert cube.retain(['abc']) == ['def']
+    assert cube.languages('Tone', macroarea='Africa') == {'abc'} and cube.count('Tone', 'Tone-yes') == 0
+
+
+def test_read_bib(tmp_path):
+    raw = DataDir(tmp_path / 'raw')
+    raw.mkdir()
+    raw.write('sources.bib', '@book{A2000,\n  author = {Name, A.},\n  year = {2000}\n}\n')
+    sources = read_bib(raw, 'sources.bib', tmp_path / 'cache')
+    cached = read_bib(raw, 'sources.bib', tmp_path / 'cache')
+    assert len(list((tmp_path / 'cache').iterdir())) == 1
+    assert cached['A2000'] == sources['A2000'] and cached['A2000'].genre == 'book'
+
+
+def test_code_version(tmp_path):
+    package = tmp_path / 'package'
+    package.joinpath('sub').mkdir(parents=True)
+    for name in ['__init__.py', 'segments.py', 'sub/templates.py']:
+        package.joinpath(name).write_text('', encoding='utf8')
+    versions = {code_version(package)}
+    for name in ['segments.py', 'sub/templates.py']:
+        package.joinpath(name).write_text('# changed', encoding='utf8')
+        versions.add(code_version(package))
+    package.joinpath('sub', 'templates.py').rename(package / 'templates.py')
+    versions.add(code_version(package))
+    assert len(versions) == 4
+
+
+def test_download(tmp_path):
+    mirror, raw = tmp_path / 'mirror', tmp_path / 'raw'
+    mirror.mkdir()
+    raw.mkdir()
+    mirror.joinpath('sources.bib').write_bytes('@book{Ä2000, x\r\n}\r\n'.encode('utf8'))
+    files = [('sources.bib', 'sources.bib', fix_bibkeys)]
+    assert download(raw, files, str(mirror)) == ['sources.bib']
+    assert raw.joinpath('sources.bib').read_bytes() == b'@book{A2000,\r\n}\r\n'
+    assert sorted(p.name for p in raw.iterdir()) == ['manifest.json', 'sources.bib']
+    assert download(raw, files, mirror.as_uri()) == []
+    assert download(raw, files, str(mirror), force=True) == ['sources.bib']
+
+
+def test_Segmenter():
+    segmenter = Segmenter('Consonant_inventory', ['/p', 't', 'ts', 'k/', 'k\u02b7', 'ts\u02b0'])
+    assert segmenter('/p t k/') == ['/p', 't', 'k/']
+    assert segmenter('/tsk\u02b7 pts\u02b0/') == ['/ts', 'k\u02b7', 'p', 'ts\u02b0/']
+    with pytest.raises(ValueError):
+        segmenter('/p x/')
+    # Segments are mapped to the normalization form given in the list of known segments:
+    segmenter = Segmenter('Vowel_inventory', ['a\u0325'])
+    assert segmenter('/\u1e01/') == ['/a\u0325/']
+    # Comments following the inventory and stray delimiters are ignored:
+    assert segmenter('/ \u1e01 /, and many more') == ['a\u0325']
+
+
+def test_Segmenters(tmp_path):
+    phonemes = tmp_path / 'phonemes.csv'
+    phonemes.write_text('Parameter_ID,Name\nVowel_inventory,a\n', encoding='utf8')
+    segmenters = Segmenters()
+    assert 'e' in segmenters['Vowel_inventory'].segments
+    segmenters.use(phonemes)
+    assert segmenters['Vowel_inventory'].segments == ['a']
+    # Changes of the file are picked up:
+    phonemes.write_text(
+        'Parameter_ID,Name\nVowel_inventory,a\nVowel_inventory,ee\n', encoding='utf8')
+    segmenters.use(phonemes)
+    assert segmenters['Vowel_inventory']('/a ee/') == ['/a', 'ee/']
+
+
+def test_SearchIndex(tmp_path):
+    index = SearchIndex()
+    index.add('1', 'abc', 'R', 'Vowel reduction in rapid speech.')
+    index.add('2', 'abc', 'Coda_restrictions', 'No reduction of the vowel.')
+    index.add('3', 'xyz', 'R', 'Rapid vowel reduction')
+    index.write(tmp_path / 'index.json')
+    index = SearchIndex.load(tmp_path / 'index.json')
+    assert [h['ID'] for h in index.search('"vowel reduction"')] == ['1', '3']
+    assert [h['ID'] for h in index.search('"vowel reduction"', language='xyz')] == ['3']
+    assert [h['ID'] for h in index.search('REDUC', parameter='R')] == ['1', '3']
+    assert [h['ID'] for h in index.search('d s')] == ['1']
+    assert index.search('"reduction vowel"') == [] and index.search('xyz') == []
+
+
+def test_diff(tmp_path):
+    cldf = pathlib.Path(__file__).parent / 'cldf'
+    old = tmp_path / 'cldf'
+    old.mkdir()
+    for p in cldf.iterdir():
+        old.joinpath(p.name).write_bytes(p.read_bytes())
+    d = diff(old, cldf)
+    assert not d['values'] and not any(any(d[k].values()) for k in ['codes', 'sources'])
+
+    with old.joinpath('values.csv').open(encoding='utf8', newline='') as fp:
+        rows = list(csv.reader(fp))
+
+    def write(rows):
+        with old.joinpath('values.csv').open('w', encoding='utf8', newline='') as fp:
+            csv.writer(fp).writerows(rows)
+
+    # Renumbered and reordered values are no difference:
+    rows = [rows[0]] + [[str(i + 1)] + r[1:] for i, r in enumerate(reversed(rows[1:]))]
+    write(rows)
+    assert not diff(old, cldf)['values']
+
+    # An edited value of a parameter with one value per language is a changed value:
+    rows = [r[:3] + ['Yes', 'Tone-yes'] + r[5:] if r[1:3] == ['alc', 'Tone'] else r for r in rows]
+    write(rows)
+    d = diff(old, cldf)
+    assert list(d['values']) == ['alc'] and list(d['values']['alc']) == ['Tone']
+    assert d['values']['alc']['Tone'] == {
+        'added': [], 'removed': [], 'changed': ['Tone-yes -> Tone-no']}
+
+    # A value missing in the old build is an added value of a multichoice parameter:
+    removed = next(r for r in rows if r[5] == 'alc-R2')
+    write([r for r in rows if r is not removed])
+    d = diff(old, cldf)
+    assert list(d['values']['alc']) == ['R', 'Tone']
+    assert d['values']['alc']['R'] == {'added': [removed[3]], 'removed': [], 'changed': []}
+
+
+def test_templates(tmp_path):
+    t = compile_template('(C)(C)V(C)')
+    assert (t.max_onset, t.max_coda, len(t)) == (2, 1, 6)
+    assert t.shapes == ['V', 'CV', 'VC', 'CCV', 'CVC', 'CCVC']
+    assert t.accepts('CCVC') and not t.accepts('CVCC')
+    assert compile_template('C(V)').shapes == ['C', 'CV']
+    assert compile_template('(CC)V((C)C)').shapes == ['V', 'VC', 'CCV', 'VCC', 'CCVC', 'CCVCC']
+    with pytest.raises(ValueError):
+        compile_template('(C)V(C')
+
+    index = TemplateIndex()
+    for lid, template in [('abc', '(C)V'), ('def', '(C)V(C)'), ('xyz', 'CV(C)(C)')]:
+        index.add(lid, template)
+    index.write(tmp_path / 'index.json')
+    index = TemplateIndex.load(tmp_path / 'index.json')
+    assert index.languages('CV') == ['abc', 'def', 'xyz']
+    assert index.languages('CVCC') == ['xyz'] and index.languages('CCV') == []
+    assert index.subsuming('CV(C)') == ['(C)V(C)', 'CV(C)(C)']
+
+    assert check_templates(pathlib.Path(__file__).parent / 'cldf') == [
+        'eus: Size_of_maximal_onset 1 contradicts template (C)(C)V(C)(C) (2)']
+
+
+def test_Syllabifier(tmp_path):
+    inventories = {'C': ['/p', 't', 't͡s', 'r/'], 'V': ['/a', 'i/']}
+    s = Syllabifier(inventories, template='(C)(C)V(C)')
+    assert s('pat͡sa') == ['pa', 't͡sa']
+    assert s('apra') == ['a', 'pra'] and s('a p r a') == ['a', 'pra']
+    assert s('patpra') == ['pat', 'pra']
+    assert s('pprra') is None and s('pak') is None
+    assert Syllabifier(inventories, template='(C)(C)V(C)', max_onset=1)('apra') == ['ap', 'ra']
+    assert Syllabifier(inventories, max_onset=1, max_coda=0, onset_obligatory=True)('a') is None
+
+    syllabifiers = load_syllabifiers(pathlib.Path(__file__).parent / 'cldf', tmp_path)
+    assert 'eus' in syllabifiers
+    assert load_syllabifiers(pathlib.Path(__file__).parent / 'cldf', tmp_path).keys() == \
+        syllabifiers.keys()
+    assert len(list(tmp_path.glob('*.pickle'))) == 1
+
+    words = [('eus', 'e u s'), ('eus', 'xyz'), ('abc', 'pa')] * 5
+    throughput = Throughput()
+    res = list(syllabify(words, syllabifiers, chunksize=2, throughput=throughput))
+    assert [r[2] for r in res[:3]] == [['e', 'us'], None, None]
+    assert (throughput.words, throughput.failed) == (15, 10)
+    assert list(syllabify(words, syllabifiers, workers=2, chunksize=2)) == res
+
+
+def test_BuildDaemon(tmp_path):
+    class StubDataset(object):
+        warmed, built = 0, []
+
+        def warm(self, args):
+            self.warmed += 1
+
+        def _cmd_makecldf(self, args):
+            self.built.append(args.full)
+            args.log.warning('something odd')
+            if args.full:
+                raise ValueError('broken')
+
+    ds, data = StubDataset(), tmp_path / 'data.tex'
+    data.write_text('a', encoding='utf8')
+    daemon = BuildDaemon(
+        ds,
+        argparse.Namespace(log=logging.getLogger(__name__), full=False),
+        tmp_path / 'daemon.sock',
+        data=[data],
+        code=[tmp_path / 'code.py'],
+        poll=0.05)
+    server = threading.Thread(target=daemon.serve)
+    server.start()
+    try:
+        for _ in range(100):
+            if daemon.socket_path.exists():
+                break
+            time.sleep(0.05)
+        res = request(daemon.socket_path, 'build')
+        assert res['ok'] and res['diagnostics'] == ['WARNING: something odd']
+        res = request(daemon.socket_path, 'build', full=True)
+        assert not res['ok'] and res['diagnostics'][-1] == 'ERROR: ValueError: broken'
+        assert not request(daemon.socket_path, 'build', unknown=1)['ok']
+        assert ds.built == [False, True]
+    finally:
+        request(daemon.socket_path, 'stop')
+        server.join()
+    assert not daemon.socket_path.exists()
+
+    data.write_text('ab', encoding='utf8')
+    assert daemon.changes() is None and ds.warmed == 2
+    (tmp_path / 'code.py').write_text('', encoding='utf8')
+    assert daemon.changes() == RESTART